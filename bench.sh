@@ -0,0 +1 @@
+python3 benchmarks/bench.py "$@"
\ No newline at end of file
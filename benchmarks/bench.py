@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# Benchmarks the markdown pipeline stage by stage on a synthetic corpus.
+#
+#   python3 benchmarks/bench.py --shape links --pages 200 --page-kb 20 \
+#       --output bench.json [--baseline old.json]
+#
+# Shapes: mixed, links, lists, code, nested, markup. Each stage is timed on its own
+# over the whole corpus; peak memory is measured in a separate traced pass so
+# tracemalloc overhead does not distort the timings.
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from blocks import scan_blocks
+from blocktype import BlockType
+from conversions import (
+    block_to_block_type,
+    generate_page,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    text_to_textnodes,
+)
+from htmlnode import LeafNode, escape_attribute, escape_text
+from inlinecache import shared_cache
+from template import Template
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>"""
+
+WORDS = "the quick brown fox jumps over lazy dogs while elves sing of valinor".split()
+SPECIALS = ["<", ">", "&", '"', "a < b", "x && y"]
+SHAPES = ("mixed", "links", "lists", "code", "nested", "markup")
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def inline(rng):
+    return rng.choice([
+        words(rng, 8),
+        f"**{words(rng, 2)}**",
+        f"_{words(rng, 2)}_",
+        f"`{rng.choice(WORDS)}`",
+        f"[{words(rng, 2)}](/pages/{rng.randrange(1000)})",
+    ])
+
+
+def link_block(rng):
+    return " ".join(f"[{words(rng, 2)}](/pages/{rng.randrange(1000)})" for _ in range(40))
+
+
+def list_block(rng):
+    if rng.random() < 0.5:
+        return "\n".join(f"- {inline(rng)} {words(rng, 4)}" for _ in range(20))
+    return "\n".join(f"{i}. {inline(rng)} {words(rng, 4)}" for i in range(1, 21))
+
+
+def code_block(rng):
+    lines = [f"    {rng.choice(WORDS)}({rng.choice(WORDS)}, {rng.randrange(100)})" for _ in range(30)]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def nested_block(rng):
+    lines = []
+    for _ in range(15):
+        lines.append(f"> **{words(rng, 2)} _{words(rng, 2)}_** [{words(rng, 1)} `{rng.choice(WORDS)}`](/deep/{rng.randrange(100)})")
+    return "\n".join(lines)
+
+
+def markup_block(rng):
+    # Text and URLs that need escaping, for the worst case of the serializer.
+    parts = []
+    for _ in range(12):
+        parts.append(f"{inline(rng)} {rng.choice(SPECIALS)}")
+        parts.append(f"[{words(rng, 1)}](/search?q={rng.randrange(1000)}&page={rng.randrange(10)})")
+    return " ".join(parts)
+
+
+def paragraph_block(rng):
+    return " ".join(inline(rng) for _ in range(12))
+
+
+BLOCKS = {
+    "links": [link_block],
+    "lists": [list_block],
+    "code": [code_block],
+    "nested": [nested_block],
+    "markup": [markup_block],
+    "mixed": [paragraph_block, link_block, list_block, code_block, nested_block],
+}
+
+
+def make_page(rng, shape, page_bytes):
+    blocks = [f"# {words(rng, 4)}"]
+    size = len(blocks[0])
+    while size < page_bytes:
+        block = rng.choice(BLOCKS[shape])(rng)
+        if rng.random() < 0.2:
+            block = f"## {words(rng, 3)}\n\n{block}"
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def make_corpus(shape, pages, page_kb, seed):
+    rng = random.Random(seed)
+    return [make_page(rng, shape, page_kb * 1024) for _ in range(pages)]
+
+
+def inline_inputs(block, block_type):
+    # The same inline strings markdown_to_html_node hands to text_to_textnodes.
+    lines = block.split("\n")
+    if block_type == BlockType.CODE:
+        return []
+    if block_type == BlockType.HEADING:
+        return [block.lstrip("#").strip()]
+    if block_type == BlockType.QUOTE:
+        return ["\n".join(line[2:] for line in lines)]
+    if block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+        return [line.split(" ", 1)[1] for line in lines]
+    return [" ".join(lines)]
+
+
+def leaf_nodes(tree):
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, LeafNode):
+            yield node
+        else:
+            stack.extend(node.children)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def run_stages(corpus, template, workdir):
+    stages = {}
+    total_bytes = sum(len(md.encode()) for md in corpus)
+
+    def record(name, seconds, nbytes=total_bytes):
+        stages[name] = {
+            "seconds": seconds,
+            "mb_per_s": nbytes / 1e6 / seconds if seconds else None,
+            "pages_per_s": len(corpus) / seconds if seconds else None,
+        }
+
+    seconds, blocks = timed(lambda: [markdown_to_blocks(md) for md in corpus])
+    record("markdown_to_blocks", seconds)
+
+    flat_blocks = [block for page in blocks for block in page]
+    seconds, types = timed(lambda: [block_to_block_type(block) for block in flat_blocks])
+    record("block_to_block_type", seconds)
+
+    seconds, _ = timed(lambda: [list(scan_blocks(md)) for md in corpus])
+    record("scan_blocks", seconds)
+
+    inline_texts = [
+        text
+        for block, block_type in zip(flat_blocks, types)
+        for text in inline_inputs(block, block_type)
+    ]
+    inline_bytes = sum(len(text.encode()) for text in inline_texts)
+    seconds, _ = timed(lambda: [text_to_textnodes(text) for text in inline_texts])
+    record("text_to_textnodes", seconds, inline_bytes)
+
+    # Every stage that renders pages starts from a cold inline cache.
+    shared_cache.clear()
+    seconds, trees = timed(lambda: [markdown_to_html_node(md) for md in corpus])
+    record("markdown_to_html_node", seconds)
+
+    seconds, bodies = timed(lambda: [tree.to_html() for tree in trees])
+    html_bytes = sum(len(body.encode()) for body in bodies)
+    record("to_html", seconds, html_bytes)
+
+    # Escaping on its own, over every leaf value and attribute value that
+    # to_html just serialized, to show its share of to_html.
+    leaves = [node for tree in trees for node in leaf_nodes(tree)]
+
+    def escape_all():
+        for node in leaves:
+            escape_text(node.value)
+            if node.props:
+                for value in node.props.values():
+                    escape_attribute(value)
+
+    escape_attribute.cache_clear()
+    seconds, _ = timed(escape_all)
+    record("escape", seconds, html_bytes)
+
+    seconds, pages = timed(lambda: [template.render({"Title": "t", "Content": body}) for body in bodies])
+    record("template", seconds, html_bytes)
+
+    def write_and_read():
+        for i, page in enumerate(pages):
+            path = os.path.join(workdir, "io", f"{i}.html")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(page)
+            with open(path, "r") as f:
+                f.read()
+
+    seconds, _ = timed(write_and_read)
+    record("file_io", seconds, html_bytes * 2)
+
+    content_dir = os.path.join(workdir, "content")
+    os.makedirs(content_dir, exist_ok=True)
+    sources = []
+    for i, md in enumerate(corpus):
+        path = os.path.join(content_dir, f"{i}.md")
+        with open(path, "w") as f:
+            f.write(md)
+        sources.append(path)
+    template_path = os.path.join(workdir, "template.html")
+    with open(template_path, "w") as f:
+        f.write(TEMPLATE)
+
+    def full_build():
+        for i, path in enumerate(sources):
+            generate_page(path, template_path, os.path.join(workdir, "docs", f"{i}.html"), "/")
+
+    shared_cache.clear()
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            seconds, _ = timed(full_build)
+        finally:
+            sys.stdout = stdout
+    record("full_build", seconds)
+    return stages
+
+
+def peak_memory(corpus, template):
+    shared_cache.clear()
+    tracemalloc.start()
+    for md in corpus:
+        template.render({"Title": "t", "Content": markdown_to_html_node(md)})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def compare(results, baseline):
+    print(f"\n{'stage':<24}{'baseline s':>12}{'current s':>12}{'change':>10}")
+    for name, stage in results["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if old is None:
+            continue
+        change = (stage["seconds"] / old["seconds"] - 1) * 100 if old["seconds"] else 0.0
+        print(f"{name:<24}{old['seconds']:>12.4f}{stage['seconds']:>12.4f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the markdown pipeline")
+    parser.add_argument("--shape", choices=SHAPES, default="mixed")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--page-kb", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.shape, args.pages, args.page_kb, args.seed)
+    template = Template(TEMPLATE)
+    with tempfile.TemporaryDirectory() as workdir:
+        stages = run_stages(corpus, template, workdir)
+    results = {
+        "python": platform.python_version(),
+        "shape": args.shape,
+        "pages": args.pages,
+        "corpus_mb": sum(len(md.encode()) for md in corpus) / 1e6,
+        "stages": stages,
+        "peak_memory_mb": peak_memory(corpus, template) / 1e6,
+    }
+
+    print(f"{args.pages} {args.shape} pages, {results['corpus_mb']:.2f} MB of markdown")
+    print(f"{'stage':<24}{'seconds':>10}{'MB/s':>10}{'pages/s':>10}")
+    for name, stage in stages.items():
+        print(f"{name:<24}{stage['seconds']:>10.4f}{stage['mb_per_s']:>10.2f}{stage['pages_per_s']:>10.1f}")
+    print(f"peak memory (single page pass): {results['peak_memory_mb']:.2f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# Compares peak memory and build time of the slotted TextNode/HTMLNode classes
+# against dict-backed copies of the classes as they were before __slots__.
+#
+#   python3 benchmarks/bench_memory.py [--paragraphs N]
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import conversions
+from inlinecache import shared_cache
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, DictTextNode)
+            and self.text == other.text
+            and self.text_type == other.text_type
+            and self.url == other.url
+        )
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+    def props_to_html(self):
+        if not self.props:
+            return ""
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, None, props)
+
+    def to_html(self):
+        if self.value is None:
+            raise ValueError("Leaf nodes must have a value")
+        if self.tag is None:
+            return f"{self.value}"
+        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+    def to_html(self):
+        if self.tag is None:
+            raise ValueError("Tag is required")
+        if not self.children:
+            raise ValueError("Parent nodes must have children")
+        return f"<{self.tag}>{''.join(child.to_html() for child in self.children)}</{self.tag}>"
+
+
+def make_document(paragraphs):
+    blocks = []
+    for i in range(paragraphs):
+        links = " ".join(f"[link {j}](/pages/{i}/{j})" for j in range(10))
+        blocks.append(f"Paragraph {i} with **bold**, _italic_ and `code`. {links}")
+        blocks.append("\n".join(f"- item {j} with **emphasis**" for j in range(5)))
+    return "\n\n".join(blocks)
+
+
+def measure(markdown):
+    # The shared inline cache would hand one run the nodes built by the other
+    # and share repeated fragments within a run, so it is off while measuring
+    # node layout.
+    maxsize = shared_cache.maxsize
+    shared_cache.clear()
+    shared_cache.maxsize = 0
+    try:
+        return measure_build(markdown)
+    finally:
+        shared_cache.maxsize = maxsize
+
+
+def measure_build(markdown):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = conversions.markdown_to_html_node(markdown)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return peak, elapsed
+
+
+def use_classes(text_node, leaf_node, parent_node):
+    conversions.TextNode = text_node
+    conversions.LeafNode = leaf_node
+    conversions.ParentNode = parent_node
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    args = parser.parse_args()
+    markdown = make_document(args.paragraphs)
+
+    use_classes(DictTextNode, DictLeafNode, DictParentNode)
+    dict_peak, dict_time = measure(markdown)
+    dict_html = conversions.markdown_to_html_node(markdown).to_html()
+    use_classes(TextNode, LeafNode, ParentNode)
+    slot_peak, slot_time = measure(markdown)
+    if conversions.markdown_to_html_node(markdown).to_html() != dict_html:
+        raise SystemExit("dict-backed and slotted nodes rendered different HTML")
+
+    print(f"document: {len(markdown) / 1e6:.2f} MB, {args.paragraphs} paragraphs")
+    print(f"dict-backed nodes: peak {dict_peak / 1e6:8.2f} MB  build {dict_time * 1000:8.1f} ms")
+    print(f"slotted nodes:     peak {slot_peak / 1e6:8.2f} MB  build {slot_time * 1000:8.1f} ms")
+    print(f"saving:            {100 * (1 - slot_peak / dict_peak):.1f}% peak memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from manifest import remove_empty_dirs
+from sync import sync_file
+from template import URL, load_template
+
+ASSET_MANIFEST_NAME = "assets.json"
+FINGERPRINT_LENGTH = 8
+
+# Root-relative URL of every static file to the URL of its fingerprinted
+# copy. basepath_rewriter consults it, so href/src URLs in pages and in the
+# template point at the fingerprinted files while it is populated.
+active_fingerprints = {}
+
+
+def fingerprint_path(relative, digest):
+    directory, name = os.path.split(relative)
+    stem, dot, extension = name.rpartition(".")
+    if not dot or not stem:
+        return os.path.join(directory, f"{name}.{digest[:FINGERPRINT_LENGTH]}")
+    return os.path.join(directory, f"{stem}.{digest[:FINGERPRINT_LENGTH]}.{extension}")
+
+
+def asset_url(relative):
+    return "/" + relative.replace(os.sep, "/")
+
+
+def read_fingerprints(manifest_path):
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remove_output(path):
+    # Along with the .gz a compressed build left next to it.
+    if not os.path.isfile(path):
+        return False
+    os.remove(path)
+    if os.path.isfile(f"{path}.gz"):
+        os.remove(f"{path}.gz")
+    return True
+
+
+def remove_copy(target_directory, fingerprinted):
+    path = os.path.join(target_directory, *fingerprinted[1:].split("/"))
+    if remove_output(path):
+        remove_empty_dirs(os.path.dirname(path), target_directory)
+
+
+def remove_fingerprints(source_directory, target_directory):
+    # Undoes the pipeline for a build without it: deletes the copies listed
+    # in docs/assets.json and the manifest itself. Returns the source paths
+    # of those assets, so the pages that linked the copies are rebuilt.
+    manifest_path = os.path.join(target_directory, ASSET_MANIFEST_NAME)
+    fingerprints = read_fingerprints(manifest_path)
+    for fingerprinted in fingerprints.values():
+        remove_copy(target_directory, fingerprinted)
+    remove_output(manifest_path)
+    active_fingerprints.clear()
+    return [os.path.join(source_directory, *url[1:].split("/")) for url in sorted(fingerprints)]
+
+
+def scan_assets(source_directory):
+    assets = []
+    with os.scandir(source_directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                assets.extend(scan_assets(entry.path))
+            elif entry.is_file():
+                assets.append((entry.path, entry.stat()))
+    return assets
+
+
+class AssetPipeline:
+    # Gives every static file a content-addressed copy next to the original
+    # (index.css -> index.3f9a2c8b.css) and writes the mapping to
+    # docs/assets.json. Hashes come from the build manifest, which only
+    # rehashes a file when its size or mtime changes.
+    def __init__(self, source_directory, target_directory, manifest, jobs=8, mode="copy"):
+        self.source_directory = source_directory
+        self.target_directory = target_directory
+        self.manifest = manifest
+        self.jobs = jobs
+        self.mode = mode
+        self.manifest_path = os.path.join(target_directory, ASSET_MANIFEST_NAME)
+        self.fingerprints = self.load()
+
+    def load(self):
+        return read_fingerprints(self.manifest_path)
+
+    def fingerprint(self, from_path, stat):
+        relative = os.path.relpath(from_path, self.source_directory)
+        fingerprinted = fingerprint_path(relative, self.manifest.digest(from_path, stat))
+        dest_path = os.path.join(self.target_directory, fingerprinted)
+        # The name changes with the content, so an existing copy is current.
+        if not os.path.exists(dest_path):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            sync_file(from_path, dest_path, self.mode)
+        return asset_url(relative), asset_url(fingerprinted)
+
+    def run(self):
+        # Returns the source paths whose fingerprinted URL changed, including
+        # removed files, so the pages that reference them can be rebuilt.
+        assets = scan_assets(self.source_directory)
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            fingerprints = dict(executor.map(lambda asset: self.fingerprint(*asset), assets))
+        changed = [
+            os.path.join(self.source_directory, *url[1:].split("/"))
+            for url in sorted(set(fingerprints) | set(self.fingerprints))
+            if fingerprints.get(url) != self.fingerprints.get(url)
+        ]
+        for url, fingerprinted in self.fingerprints.items():
+            if fingerprints.get(url) != fingerprinted:
+                remove_copy(self.target_directory, fingerprinted)
+        if changed or not os.path.isfile(self.manifest_path):
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(fingerprints, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        self.fingerprints = fingerprints
+        active_fingerprints.clear()
+        active_fingerprints.update(fingerprints)
+        return changed
+
+    def template_fingerprints(self, template_path):
+        urls = [value for kind, value in load_template(template_path).segments if kind == URL]
+        return {url: self.fingerprints[url] for url in urls if url in self.fingerprints}
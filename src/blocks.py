@@ -0,0 +1,107 @@
+import re
+from blocktype import BlockType
+
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+BLANK_LINES_PATTERN = re.compile(r"\n(?:[^\S\n]*\n)+")
+CONTENT_PATTERN = re.compile(r"\S")
+FENCE_OPEN_PATTERN = re.compile(r"```[^`\n]*")
+FENCE_CLOSE_PATTERN = re.compile(r"```[^\S\n]*$", re.MULTILINE)
+
+
+class Block:
+    __slots__ = ("block_type", "start", "end", "lines")
+
+    def __init__(self, block_type, start, end, lines):
+        self.block_type = block_type
+        self.start = start
+        self.end = end
+        self.lines = lines
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Block)
+            and self.block_type == other.block_type
+            and self.start == other.start
+            and self.end == other.end
+            and self.lines == other.lines
+        )
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.start}-{self.end}, {self.lines})"
+
+
+def classify_lines(lines):
+    # Quote, unordered and ordered prefixes exclude each other, so the first
+    # line picks the only candidate and each line is checked once.
+    first = lines[0]
+    if first.startswith(HEADING_PREFIXES):
+        return BlockType.HEADING
+    if first.startswith("```") and lines[-1].endswith("```"):
+        return BlockType.CODE
+    if first.startswith(">"):
+        for line in lines:
+            if not line.startswith(">"):
+                return BlockType.PARAGRAPH
+        return BlockType.QUOTE
+    if first.startswith("- "):
+        for line in lines:
+            if not line.startswith("- "):
+                return BlockType.PARAGRAPH
+        return BlockType.UNORDERED_LIST
+    if first.startswith("1. "):
+        for number, line in enumerate(lines, 1):
+            if not line.startswith(f"{number}. "):
+                return BlockType.PARAGRAPH
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def find_fence_end(markdown, fence_start):
+    # Only a fence line, ``` and an info string without backticks, opens a
+    # fence; it closes on the first later line that ends with ```. Anything
+    # else, such as ```x``` at the start of a paragraph, is left to the
+    # blank-line split.
+    line_end = markdown.find("\n", fence_start)
+    if line_end == -1:
+        line_end = len(markdown)
+    if FENCE_OPEN_PATTERN.fullmatch(markdown, fence_start, line_end) is None:
+        return None
+    closing = FENCE_CLOSE_PATTERN.search(markdown, line_end)
+    if closing is None:
+        return None
+    return closing.start() + 3
+
+
+def scan_blocks(markdown):
+    # One scan over the document: regex searches jump from block to block,
+    # each block is split into lines once and classified as it is cut out. A
+    # fenced code block runs to its closing fence, blank lines included. Each
+    # block keeps its lines, outer whitespace trimmed, and its line span
+    # [start, end).
+    position = 0
+    line = 0
+    while True:
+        content = CONTENT_PATTERN.search(markdown, position)
+        if content is None:
+            return
+        block_start = content.start()
+        start_line = line + markdown.count("\n", position, block_start)
+        block_type = None
+        end = None
+        if markdown.startswith("```", block_start):
+            end = find_fence_end(markdown, block_start)
+            if end is not None:
+                block_type = BlockType.CODE
+        if end is None:
+            separator = BLANK_LINES_PATTERN.search(markdown, block_start)
+            end = separator.start() if separator is not None else len(markdown)
+        lines = markdown[block_start:end].rstrip().split("\n")
+        if block_type is None:
+            block_type = classify_lines(lines)
+        yield Block(block_type, start_line, start_line + len(lines), lines)
+        line = start_line + len(lines) - 1
+        position = end
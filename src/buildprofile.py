@@ -0,0 +1,88 @@
+import json
+import os
+
+# Stages in pipeline order. Byte counts for in-memory stages are the length of
+# the string the stage produced or consumed.
+STAGES = ("read", "block_scan", "inline_parse", "serialize", "template", "write")
+
+
+class PageProfile:
+    __slots__ = ("path", "stages")
+
+    def __init__(self, path):
+        self.path = path
+        self.stages = {}
+
+    def add(self, stage, seconds, nbytes=0):
+        totals = self.stages.get(stage)
+        if totals is None:
+            self.stages[stage] = [seconds, nbytes]
+        else:
+            totals[0] += seconds
+            totals[1] += nbytes
+
+    def total(self):
+        return sum(seconds for seconds, _ in self.stages.values())
+
+    def to_dict(self):
+        return {
+            "page": self.path,
+            "total": self.total(),
+            "stages": {
+                stage: {"seconds": seconds, "bytes": nbytes}
+                for stage, (seconds, nbytes) in self.stages.items()
+            },
+        }
+
+
+class BuildProfiler:
+    def __init__(self):
+        self.pages = []
+
+    def page(self, path):
+        profile = PageProfile(path)
+        self.pages.append(profile)
+        return profile
+
+    def extend(self, profiles):
+        self.pages.extend(profiles)
+
+    def stage_totals(self):
+        totals = {stage: [0.0, 0] for stage in STAGES}
+        for profile in self.pages:
+            for stage, (seconds, nbytes) in profile.stages.items():
+                totals.setdefault(stage, [0.0, 0])
+                totals[stage][0] += seconds
+                totals[stage][1] += nbytes
+        return totals
+
+    def summary(self, top=10):
+        totals = self.stage_totals()
+        build_seconds = sum(seconds for seconds, _ in totals.values())
+        lines = [f"Build profile: {len(self.pages)} page(s), {build_seconds * 1000:.1f} ms in page stages"]
+        lines.append(f"  {'stage':<16}{'ms':>10}{'MB':>10}{'share':>8}")
+        for stage, (seconds, nbytes) in totals.items():
+            share = seconds / build_seconds * 100 if build_seconds else 0.0
+            lines.append(f"  {stage:<16}{seconds * 1000:>10.2f}{nbytes / 1e6:>10.3f}{share:>7.1f}%")
+        slowest = sorted(self.pages, key=lambda profile: profile.total(), reverse=True)[:top]
+        lines.append(f"Slowest {len(slowest)} page(s):")
+        for profile in slowest:
+            if not profile.stages:
+                continue
+            stage = max(profile.stages, key=lambda name: profile.stages[name][0])
+            lines.append(f"  {profile.total() * 1000:>9.2f} ms  {profile.path}  (mostly {stage})")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        trace_dir = os.path.dirname(path)
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+        data = {
+            "stages": {
+                stage: {"seconds": seconds, "bytes": nbytes}
+                for stage, (seconds, nbytes) in self.stage_totals().items()
+            },
+            "pages": [profile.to_dict() for profile in self.pages],
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from manifest import remove_empty_dirs
+
+COMPRESS_INDEX_VERSION = 1
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".svg", ".xml", ".json", ".txt", ".map")
+# Below this the gzip header and trailer eat most of the saving.
+MIN_COMPRESS_BYTES = 256
+
+
+def is_compressible(path):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def gzip_bytes(data, level=9):
+    # mtime=0 and no file name keep the output identical between builds.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Compressor:
+    # Writes a .gz sibling next to every compressible output in the target
+    # directory. Pages are handed over as bytes right after they are written;
+    # zlib releases the GIL, so a thread pool compresses them in parallel with
+    # rendering. The index records the size, mtime and hash of each output
+    # when its .gz was made, so unchanged outputs are never read again.
+    def __init__(self, target_directory, index_path, jobs=4, level=9):
+        self.target_directory = target_directory
+        self.index_path = index_path
+        self.level = level
+        self.index = {}
+        self.executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self.pending = []
+        # Worker processes forked from the build inherit this object; they
+        # compress in place and hand their index entries back instead.
+        self.owner = os.getpid()
+        self.results = []
+        self.handled = set()
+        self.lock = threading.Lock()
+        self.compressed = 0
+        self.unchanged = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.load()
+
+    def __getstate__(self):
+        # Sent to worker processes started with spawn or forkserver, which
+        # compress inline and never use the thread pool.
+        state = dict(self.__dict__)
+        for name in ("executor", "lock", "pending", "results", "handled"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.pending = []
+        self.results = []
+        self.handled = set()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == COMPRESS_INDEX_VERSION and data.get("level") == self.level:
+            self.index = data.get("outputs", {})
+
+    def save(self):
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        data = {"version": COMPRESS_INDEX_VERSION, "level": self.level, "outputs": self.index}
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def relative(self, path):
+        return os.path.relpath(path, self.target_directory).replace(os.sep, "/")
+
+    def submit(self, dest_path, data):
+        # dest_path must already hold data; its stat is what later builds
+        # compare against.
+        if not is_compressible(dest_path):
+            return
+        if len(data) < MIN_COMPRESS_BYTES:
+            self.drop(self.relative(dest_path))
+            return
+        digest = hashlib.sha256(data).hexdigest()
+        if os.getpid() != self.owner:
+            self.results.append(self.compress(dest_path, data, digest))
+        else:
+            self.pending.append(self.executor.submit(self.compress, dest_path, data, digest))
+
+    def compress(self, dest_path, data, digest):
+        stat = os.stat(dest_path)
+        relative = self.relative(dest_path)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+        gz_path = f"{dest_path}.gz"
+        previous = self.index.get(relative)
+        # Rewritten with the same bytes, as dependents often are: the old
+        # .gz is still right.
+        if previous is not None and previous["hash"] == digest and os.path.exists(gz_path):
+            return relative, entry, None
+        compressed = gzip_bytes(data, self.level)
+        tmp_path = f"{gz_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, gz_path)
+        return relative, entry, (len(data), len(compressed))
+
+    def collect(self):
+        # Index entries of the pages a worker process compressed.
+        results, self.results = self.results, []
+        return results
+
+    def record(self, results):
+        with self.lock:
+            for relative, entry, sizes in results:
+                self.index[relative] = entry
+                self.handled.add(relative)
+                if sizes is None:
+                    self.unchanged += 1
+                else:
+                    self.compressed += 1
+                    self.bytes_in += sizes[0]
+                    self.bytes_out += sizes[1]
+
+    def wait(self):
+        pending, self.pending = self.pending, []
+        results = []
+        error = None
+        for future in pending:
+            try:
+                results.append(future.result())
+            except OSError as e:
+                error = error or e
+        self.record(results)
+        if error is not None:
+            raise error
+
+    def drop(self, relative):
+        self.index.pop(relative, None)
+        remove_quietly(os.path.join(self.target_directory, *relative.split("/")) + ".gz")
+
+    def sweep(self):
+        # Picks up every compressible output not handed over in memory, such
+        # as copied static files, fingerprinted assets and site artifacts, and
+        # removes the .gz of outputs that are gone. Only outputs whose size or
+        # mtime changed since they were compressed are read.
+        self.wait()
+        live = set()
+        for root, _, names in os.walk(self.target_directory):
+            for name in names:
+                if not is_compressible(name):
+                    continue
+                path = os.path.join(root, name)
+                relative = self.relative(path)
+                live.add(relative)
+                if relative in self.handled:
+                    continue
+                stat = os.stat(path)
+                entry = self.index.get(relative)
+                if stat.st_size < MIN_COMPRESS_BYTES:
+                    self.drop(relative)
+                elif entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns and os.path.exists(f"{path}.gz"):
+                    self.unchanged += 1
+                else:
+                    self.pending.append(self.executor.submit(self.compress_file, path))
+        self.wait()
+        for relative in set(self.index) - live:
+            self.drop(relative)
+            directory = os.path.dirname(os.path.join(self.target_directory, *relative.split("/")))
+            remove_empty_dirs(directory, self.target_directory)
+        self.handled.clear()
+
+    def compress_file(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        return self.compress(path, data, hashlib.sha256(data).hexdigest())
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
+
+    def summary(self):
+        ratio = self.bytes_out / self.bytes_in * 100 if self.bytes_in else 0.0
+        return (
+            f"Compression: {self.compressed} file(s) compressed, {self.unchanged} unchanged, "
+            f"{self.bytes_in / 1e6:.2f} MB to {self.bytes_out / 1e6:.2f} MB ({ratio:.1f}%)"
+        )
+
+
+active_compressor = None
+
+
+def configure(target_directory, index_path=None, jobs=4, level=9):
+    global active_compressor
+    if active_compressor is not None:
+        active_compressor.close()
+    active_compressor = Compressor(target_directory, index_path, jobs, level) if index_path is not None else None
+    return active_compressor
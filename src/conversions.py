@@ -1,27 +1,45 @@
 from textnode import TextType, TextNode
 from htmlnode import LeafNode, ParentNode, HTMLNode
 from blocktype import BlockType
+from blocks import classify_lines, scan_blocks
+from sync import sync_tree
+from template import TrustedHTML, load_template
+from inlinecache import shared_cache
+from frontmatter import split_front_matter, template_variables
+from pagecache import mark_url, unmark_urls
+import assets
+import compress
+import images
+import pagecache
+import search
 import re
 import os
-import shutil
+import time
+
+def simple_leaf(tag=None):
+    return lambda node: LeafNode(tag, node.text)
+
+def image_leaf(node):
+    props = {"src": node.url, "alt": node.text}
+    attributes = images.active_images.get(node.url)
+    if attributes is not None:
+        props.update(attributes)
+    return LeafNode("img", "", props)
+
+TEXT_TYPE_TO_HTML = {
+    TextType.TEXT: simple_leaf(),
+    TextType.BOLD: simple_leaf("b"),
+    TextType.ITALIC: simple_leaf("i"),
+    TextType.CODE: simple_leaf("code"),
+    TextType.LINK: lambda node: LeafNode("a", node.text, {"href": node.url}),
+    TextType.IMAGE: image_leaf,
+}
 
 def text_node_to_html_node(text_node: TextNode):
-    def simple_leaf(tag=None):
-        return lambda node: LeafNode(tag, node.text)
-
-    text_type_dict = {
-        TextType.TEXT: simple_leaf(),
-        TextType.BOLD: simple_leaf("b"),
-        TextType.ITALIC: simple_leaf("i"),
-        TextType.CODE: simple_leaf("code"),
-        TextType.LINK: lambda node: LeafNode("a", node.text, {"href": node.url}),
-        TextType.IMAGE: lambda node: LeafNode("img", "", {"src": node.url, "alt": node.text})
-    }
-
-    if text_node.text_type in text_type_dict:
-        return text_type_dict[text_node.text_type](text_node)
-    else:
-         raise ValueError(f"{text_node.text_type} is not a valid TextType")
+    convert = TEXT_TYPE_TO_HTML.get(text_node.text_type)
+    if convert is None:
+        raise ValueError(f"{text_node.text_type} is not a valid TextType")
+    return convert(text_node)
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
@@ -43,246 +61,269 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
                         new_nodes.append(new_node)
     return new_nodes
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+INLINE_TOKEN_PATTERN = re.compile(r"\*\*|_|`|!?\[")
+INLINE_DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
 def extract_markdown_images(text):
-    matches = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = IMAGE_PATTERN.findall(text)
     return matches
 
 def extract_markdown_links(text):
-    matches = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    matches = LINK_PATTERN.findall(text)
     return matches
 
-def split_nodes_image(old_nodes):
+def split_nodes_pattern(old_nodes, pattern, text_type):
     new_nodes = []
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
-        else:
-            images = extract_markdown_images(node.text)
-            if not images:
-                new_nodes.append(node)
-            else:
-                current_text = node.text
-                for alt_text, url in images:
-                    sections = current_text.split(f"![{alt_text}]({url})", 1)
-                    if sections[0]:
-                        new_nodes.append(TextNode(sections[0], TextType.TEXT))
-                    image_node = TextNode(alt_text, TextType.IMAGE, url)
-                    new_nodes.append(image_node)
-                    current_text = sections[1]
-                if current_text:
-                    new_nodes.append(TextNode(current_text, TextType.TEXT))
+            continue
+        last_end = 0
+        for match in pattern.finditer(node.text):
+            if match.start() > last_end:
+                new_nodes.append(TextNode(node.text[last_end:match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            last_end = match.end()
+        if last_end == 0:
+            new_nodes.append(node)
+        elif last_end < len(node.text):
+            new_nodes.append(TextNode(node.text[last_end:], TextType.TEXT))
     return new_nodes
 
+def split_nodes_image(old_nodes):
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
+
 def split_nodes_link(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-        else:
-            links = extract_markdown_links(node.text)
-            if not links:
-                new_nodes.append(node)
-            else:
-                current_text = node.text
-                for alt_text, url in links:
-                    sections = current_text.split(f"[{alt_text}]({url})", 1)
-                    if sections[0]:
-                        new_nodes.append(TextNode(sections[0], TextType.TEXT))
-                    link_node = TextNode(alt_text, TextType.LINK, url)
-                    new_nodes.append(link_node)
-                    current_text = sections[1]
-                if current_text:
-                    new_nodes.append(TextNode(current_text, TextType.TEXT))
-    return new_nodes
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK)
 
 def text_to_textnodes(text):
-    new_nodes = [TextNode(text, TextType.TEXT)]
-    new_nodes = split_nodes_delimiter(new_nodes, "**", TextType.BOLD)
-    new_nodes = split_nodes_delimiter(new_nodes, "_", TextType.ITALIC)
-    new_nodes = split_nodes_delimiter(new_nodes, "`", TextType.CODE)
-    new_nodes = split_nodes_image(new_nodes)
-    new_nodes = split_nodes_link(new_nodes)
+    # One left-to-right scan: every delimiter, image or link is consumed as soon
+    # as it is reached, so the text is never re-split and the cost stays linear
+    # in the number of tokens.
+    new_nodes = []
+    text_start = 0
+    position = 0
+    while True:
+        match = INLINE_TOKEN_PATTERN.search(text, position)
+        if match is None:
+            break
+        token = match.group()
+        token_start = match.start()
+
+        if token in INLINE_DELIMITERS:
+            closing = text.find(token, match.end())
+            if closing == -1:
+                raise ValueError(f"Invalid markdown: unmatched delimiter '{token}'")
+            if token_start > text_start:
+                new_nodes.append(TextNode(text[text_start:token_start], TextType.TEXT))
+            inner = text[match.end():closing]
+            if inner:
+                new_nodes.append(TextNode(inner, INLINE_DELIMITERS[token]))
+            position = text_start = closing + len(token)
+            continue
+
+        if token == "![":
+            link = IMAGE_PATTERN.match(text, token_start)
+            text_type = TextType.IMAGE
+        else:
+            link = LINK_PATTERN.match(text, token_start)
+            text_type = TextType.LINK
+        if link is None:
+            position = token_start + 1
+            continue
+        if token_start > text_start:
+            new_nodes.append(TextNode(text[text_start:token_start], TextType.TEXT))
+        new_nodes.append(TextNode(link.group(1), text_type, link.group(2)))
+        position = text_start = link.end()
+
+    if text_start < len(text):
+        new_nodes.append(TextNode(text[text_start:], TextType.TEXT))
     return new_nodes
 
 def markdown_to_blocks(markdown):
-    block_list = markdown.split("\n\n")
-    processed_blocks = []
-    for block in block_list:
-        stripped_block = block.strip()
-        if stripped_block != "":
-            processed_blocks.append(stripped_block)
-
-    return processed_blocks
+    return [block.text for block in scan_blocks(markdown)]
 
 def block_to_block_type(block):
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-        return BlockType.HEADING
-
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-
-    split_by_line = block.split("\n")
-
-    boolean_list = []
-    for line in split_by_line:
-        if line.startswith(">"):
-            boolean_list.append(True)
-        else:
-            boolean_list.append(False)
-    if all(boolean_list):
-        return BlockType.QUOTE
-
-    boolean_list = []
-    for line in split_by_line:
-        if line.startswith("- "):
-            boolean_list.append(True)
-        else:
-            boolean_list.append(False)
-    if all(boolean_list):
-        return BlockType.UNORDERED_LIST
-
-    boolean_list = []
-    for i, line in enumerate(split_by_line):
-        if line.startswith(f"{i+1}. "):
-            boolean_list.append(True)
+    return classify_lines(block.split("\n"))
+
+class InlineRenderer:
+    # Turns inline markdown into HTML child nodes for block handlers. Every
+    # handler goes through one of these, so per-page concerns such as
+    # profiling, the shared inline cache and collecting the page's TextNodes
+    # for the search and dependency indexes stay out of the handlers.
+    def __init__(self, profile=None, cache=None, text_nodes=None):
+        self.profile = profile
+        self.cache = cache if cache is not None else shared_cache
+        self.text_nodes = text_nodes
+
+    def __call__(self, text):
+        started = time.perf_counter()
+        entry = self.cache.get(text) if self.cache.enabled() else None
+        if entry is not None:
+            text_nodes = entry[0]
+            html_child_list = list(entry[1])
         else:
-            boolean_list.append(False)
-    if all(boolean_list):
-        return BlockType.ORDERED_LIST
-
-    return BlockType.PARAGRAPH
-
-def markdown_to_html_node(markdown):
-    block_list = markdown_to_blocks(markdown)
-
-    def block_to_block_type_dict(block_list):
-        block_type_dict = {}
-        for block in block_list:
-            block_type_dict[block] = block_to_block_type(block)
-        return block_type_dict
-
-    def create_child_list(block):
-        text_nodes = text_to_textnodes(block)
-        html_child_list = []
-        for text_node in text_nodes:
-            html_node = text_node_to_html_node(text_node)
-            html_child_list.append(html_node)
+            text_nodes = text_to_textnodes(text)
+            html_child_list = []
+            for text_node in text_nodes:
+                html_node = text_node_to_html_node(text_node)
+                html_child_list.append(html_node)
+            self.cache.put(text, text_nodes, html_child_list)
+        if self.text_nodes is not None:
+            self.text_nodes.extend(text_nodes)
+        if self.profile is not None:
+            self.profile.add("inline_parse", time.perf_counter() - started, len(text))
         return html_child_list
 
-    def create_para_parent(html_child_list):
-        node = ParentNode("p", html_child_list)
-        return node
-
-    def create_heading_parent(html_child_list, level):
-        node = ParentNode(f"h{level}", html_child_list)
-        return node
-
-    def create_code_parent(html_leaf_node):
-        code_parent = ParentNode("code", [html_leaf_node])
-        pre_parent = ParentNode("pre", [code_parent])
-        return pre_parent
-
-    def create_ordered_parent(list_items):
-        li_nodes = []
-        for item_text in list_items:
-            item_children = create_child_list(item_text)
-            li_node = ParentNode("li", item_children)
-            li_nodes.append(li_node)
-        ol_node = ParentNode("ol", li_nodes)
-        return ol_node
-
-    def create_unordered_parent(list_items):
-        li_nodes = []
-        for item_text in list_items:
-            item_children = create_child_list(item_text)
-            li_node = ParentNode("li", item_children)
-            li_nodes.append(li_node)
-        ul_node = ParentNode("ul", li_nodes)
-        return ul_node
-
-    def create_quote_parent(html_child_list):
-        node = ParentNode("blockquote", html_child_list)
-        return node
-
-    def listify(block):
-        lines = block.split("\n")
-        list_lines = []
-        for line in lines:
-            if line.startswith("-"):
-                list_lines.append(line[2:])
-            else:
-                parts = line.split(". ", 1)
-                list_lines.append(parts[1])
-        return list_lines
-
-    html_node_blocks=[]
-
-
-
-    block_type_dict = block_to_block_type_dict(block_list)
-    for block, block_type in block_type_dict.items():
-        if block_type == BlockType.CODE:
-            code_content = block[4:-3]
-            node = TextNode(code_content, TextType.TEXT)
-            html_node = text_node_to_html_node(node)
-            html_node_blocks.append(create_code_parent(html_node))
-
-        elif block_type == BlockType.HEADING:
-            if block.startswith("#"):
-                count = 0
-                for char in block:
-                    if char == "#":
-                        count += 1
-                    else:
-                        break
-                heading_text = block[count:].strip()
-                heading_children = create_child_list(heading_text)
-                heading_node = create_heading_parent(heading_children, count)
-                html_node_blocks.append(heading_node)
-
-        elif block_type == BlockType.PARAGRAPH:
-            lines = block.split("\n")
-            paragraph = " ".join(lines)
-            para_children = create_child_list(paragraph)
-            para_node = create_para_parent(para_children)
-            html_node_blocks.append(para_node)
-
-        elif block_type == BlockType.QUOTE:
-            lines = block.split("\n")
-            quote_lines = []
-            for line in lines:
-                quote_lines.append(line[2:])
-            quote_content = "\n".join(quote_lines)
-            quote_children = create_child_list(quote_content)
-            quote_node = create_quote_parent(quote_children)
-            html_node_blocks.append(quote_node)
-
-        elif block_type == BlockType.ORDERED_LIST:
-            list_items = listify(block)
-            ol_node = create_ordered_parent(list_items)
-            html_node_blocks.append(ol_node)
-
-        elif block_type == BlockType.UNORDERED_LIST:
-            list_items = listify(block)
-            ul_node = create_unordered_parent(list_items)
-            html_node_blocks.append(ul_node)
-
-    div_node = ParentNode("div", html_node_blocks)
-    return div_node
-
-def copy_files_recursion(source_directory, target_directory):
-    source_list = os.listdir(source_directory)
-    for item in source_list:
-        from_path = os.path.join(source_directory, item)
-        dest_path = os.path.join(target_directory, item)
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
-            print(f"Copying {from_path} to {dest_path}")
-        if os.path.isdir(from_path):
-            if not os.path.isdir(dest_path):
-                os.mkdir(dest_path)
-                print(f"Creating directory {dest_path}")
-            copy_files_recursion(from_path, dest_path)
+def list_items(lines):
+    items = []
+    for line in lines:
+        if line.startswith("-"):
+            items.append(line[2:])
+        else:
+            parts = line.split(". ", 1)
+            items.append(parts[1])
+    return items
+
+def code_block_text(block):
+    return block.text[4:-3]
+
+def heading_parts(block):
+    text = block.text
+    count = len(text) - len(text.lstrip("#"))
+    return count, text[count:].strip()
+
+def paragraph_text(block):
+    return " ".join(block.lines)
+
+def quote_text(block):
+    return "\n".join(line[2:] for line in block.lines)
+
+def code_block_to_html_node(block, render_inline):
+    html_node = text_node_to_html_node(TextNode(code_block_text(block), TextType.TEXT))
+    return ParentNode("pre", [ParentNode("code", [html_node])])
+
+def heading_block_to_html_node(block, render_inline):
+    level, heading_text = heading_parts(block)
+    return ParentNode(f"h{level}", render_inline(heading_text))
+
+def paragraph_block_to_html_node(block, render_inline):
+    return ParentNode("p", render_inline(paragraph_text(block)))
+
+def quote_block_to_html_node(block, render_inline):
+    return ParentNode("blockquote", render_inline(quote_text(block)))
+
+def ordered_list_block_to_html_node(block, render_inline):
+    li_nodes = [ParentNode("li", render_inline(item)) for item in list_items(block.lines)]
+    return ParentNode("ol", li_nodes)
+
+def unordered_list_block_to_html_node(block, render_inline):
+    li_nodes = [ParentNode("li", render_inline(item)) for item in list_items(block.lines)]
+    return ParentNode("ul", li_nodes)
+
+BLOCK_HANDLERS = {
+    BlockType.CODE: code_block_to_html_node,
+    BlockType.HEADING: heading_block_to_html_node,
+    BlockType.PARAGRAPH: paragraph_block_to_html_node,
+    BlockType.QUOTE: quote_block_to_html_node,
+    BlockType.ORDERED_LIST: ordered_list_block_to_html_node,
+    BlockType.UNORDERED_LIST: unordered_list_block_to_html_node,
+}
+BUILTIN_BLOCK_HANDLERS = dict(BLOCK_HANDLERS)
+# The inline markdown each built-in handler passes to render_inline.
+BUILTIN_INLINE_TEXTS = {
+    BlockType.CODE: lambda block: [],
+    BlockType.HEADING: lambda block: [heading_parts(block)[1]],
+    BlockType.PARAGRAPH: lambda block: [paragraph_text(block)],
+    BlockType.QUOTE: lambda block: [quote_text(block)],
+    BlockType.ORDERED_LIST: lambda block: list_items(block.lines),
+    BlockType.UNORDERED_LIST: lambda block: list_items(block.lines),
+}
+BLOCK_DETECTORS = []
+
+def register_block_handler(block_type, handler, detector=None):
+    # handler(block, render_inline) returns the HTMLNode for one block. With a
+    # detector(block) predicate, scanned blocks it accepts are re-typed as
+    # block_type before dispatch, which is how new block types are added.
+    BLOCK_HANDLERS[block_type] = handler
+    if detector is not None:
+        BLOCK_DETECTORS.append((detector, block_type))
+
+def callable_name(function):
+    return f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', repr(function))}"
+
+def block_handlers_fingerprint():
+    # Names every registered handler and detector, for caches of rendered
+    # bodies. Functions are named, not hashed, so editing a handler in place
+    # still needs a PARSER_VERSION bump.
+    handlers = sorted(f"{block_type}={callable_name(handler)}" for block_type, handler in BLOCK_HANDLERS.items())
+    detectors = [f"{callable_name(detector)}>{block_type}" for detector, block_type in BLOCK_DETECTORS]
+    return ";".join(handlers + detectors)
+
+def detect_block_type(block):
+    for detector, detected_type in BLOCK_DETECTORS:
+        if detector(block):
+            return detected_type
+    return block.block_type
+
+def builtin_block_type(block):
+    # The block's type when a built-in handler renders it, or None when a
+    # registered handler has replaced it.
+    block_type = detect_block_type(block)
+    handler = BLOCK_HANDLERS.get(block_type)
+    if handler is None or handler is not BUILTIN_BLOCK_HANDLERS.get(block_type):
+        return None
+    return block_type
+
+def block_to_html_node(block, render_inline=None):
+    if render_inline is None:
+        render_inline = InlineRenderer()
+    block_type = detect_block_type(block)
+    if block_type not in BLOCK_HANDLERS:
+        raise ValueError(f"No handler registered for block type {block_type}")
+    return BLOCK_HANDLERS[block_type](block, render_inline)
+
+def iter_html_nodes(markdown, profile=None, text_nodes=None):
+    blocks = scan_blocks(markdown)
+    if profile is not None:
+        started = time.perf_counter()
+        blocks = list(blocks)
+        profile.add("block_scan", time.perf_counter() - started, len(markdown))
+    render_inline = InlineRenderer(profile, text_nodes=text_nodes)
+    for block in blocks:
+        yield block_to_html_node(block, render_inline)
+
+def markdown_to_html_node(markdown, profile=None, text_nodes=None):
+    return ParentNode("div", list(iter_html_nodes(markdown, profile, text_nodes)))
+
+def page_text_nodes(markdown, cache=None):
+    # The inline TextNodes of every block, as the renderer sees them. Blocks
+    # with a built-in handler are only tokenized; the rest go through their
+    # handler. A caller that runs before the image stage passes its own
+    # cache, so no <img> built without attributes lands in the shared one.
+    text_nodes = []
+    render_inline = None
+    for block in scan_blocks(markdown):
+        block_type = builtin_block_type(block)
+        if block_type is not None:
+            for text in BUILTIN_INLINE_TEXTS[block_type](block):
+                text_nodes.extend(text_to_textnodes(text))
+            continue
+        if render_inline is None:
+            render_inline = InlineRenderer(cache=cache, text_nodes=text_nodes)
+        block_to_html_node(block, render_inline)
+    return text_nodes
+
+def copy_files_recursion(source_directory, target_directory, manifest=None, jobs=8, mode="copy"):
+    result = sync_tree(source_directory, target_directory, jobs, mode, manifest)
+    print(result.summary())
+    return result
 
 def extract_title(markdown):
     md_lines = markdown.split("\n")
@@ -292,35 +333,156 @@ def extract_title(markdown):
             return header
     raise ValueError("No title was found.")
 
-def generate_page(from_path, template_path, dest_path, basepath):
+def basepath_rewriter(basepath):
+    fingerprints = assets.active_fingerprints
+    if basepath == "/" and not fingerprints:
+        return None
+
+    def rewrite_url(url):
+        if url.startswith("/") and not url.startswith("//"):
+            return basepath + fingerprints.get(url, url)[1:]
+        return url
+    return rewrite_url
+
+def heading_title(markdown):
+    try:
+        return extract_title(markdown)
+    except ValueError:
+        return ""
+
+def page_content(markdown, rewrite_url=None, profile=None, title=None, text_nodes=None):
+    # Returns the title and the body: an HTMLNode to stream into the template,
+    # or rendered TrustedHTML when the page cache is active. A title from front
+    # matter wins over the page's first heading. Inline TextNodes are
+    # appended to text_nodes whenever the markdown is parsed, which a cache
+    # hit skips.
+    cache = pagecache.active_cache
+    if cache is None or not cache.cacheable(markdown):
+        if title is None:
+            title = extract_title(markdown)
+        return title, markdown_to_html_node(markdown, profile, text_nodes)
+    handlers = block_handlers_fingerprint()
+    started = time.perf_counter()
+    cached = cache.get(markdown, handlers)
+    if cached is not None:
+        cached_title, body = cached
+        if profile is not None:
+            profile.add("cache_read", time.perf_counter() - started, len(body))
+    else:
+        # The cache is keyed by the body alone, so it stores the heading
+        # title even when front matter overrides it for this page.
+        cached_title = extract_title(markdown) if title is None else heading_title(markdown)
+        html_node = markdown_to_html_node(markdown, profile, text_nodes)
+        started = time.perf_counter()
+        body = html_node.to_html(mark_url)
+        if profile is not None:
+            profile.add("serialize", time.perf_counter() - started, len(body))
+        cache.put(markdown, cached_title, body, handlers)
+    if title is None:
+        if not cached_title:
+            raise ValueError("No title was found.")
+        title = cached_title
+    return title, TrustedHTML(unmark_urls(body, rewrite_url))
+
+def page_variables(source, rewrite_url=None, profile=None):
+    # Returns the page metadata, with its final title, and the template
+    # variables: Title, Content and every front matter key.
+    meta, markdown = split_front_matter(source)
+    text_nodes = [] if search.active_index is not None else None
+    title, content = page_content(markdown, rewrite_url, profile, meta.get("title"), text_nodes)
+    meta["title"] = title
+    variables = template_variables(meta)
+    variables["Title"] = title
+    variables["Content"] = content
+    # Term weights travel with the metadata, also back from worker
+    # processes. Without text the site index reads the page only if the
+    # search index does not have it yet.
+    if text_nodes:
+        meta[search.SEARCH_TERMS] = search.page_terms(title, [node.text for node in text_nodes])
+    return meta, variables
+
+def render_page(from_path, template_path, basepath):
+    with open(from_path, "r") as f:
+        from_f = f.read()
+    template = load_template(template_path)
+    rewrite_url = basepath_rewriter(basepath)
+    meta, variables = page_variables(from_f, rewrite_url)
+    return meta, template.render(variables, rewrite_url)
+
+def generate_page(from_path, template_path, dest_path, basepath, profile=None):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    started = time.perf_counter()
     with open(from_path, "r") as f:
         from_f = f.read()
-    with open(template_path, "r") as f:
-        temp_f = f.read()
-    from_html = markdown_to_html_node(from_f).to_html()
-    title = extract_title(from_f)
-    temp_f = temp_f.replace("{{ Title }}", title)
-    temp_f = temp_f.replace("{{ Content }}", from_html)
-    temp_f = temp_f.replace('href="/', f'href="{basepath}')
-    temp_f = temp_f.replace('src="/', f'src="{basepath}')
+    if profile is not None:
+        profile.add("read", time.perf_counter() - started, len(from_f))
+    template = load_template(template_path)
+    rewrite_url = basepath_rewriter(basepath)
+    meta, variables = page_variables(from_f, rewrite_url, profile)
+    content = variables["Content"]
     dest_dir = os.path.dirname(dest_path)
     os.makedirs(dest_dir, exist_ok=True)
+    compressor = compress.active_compressor
+    if profile is None and compressor is None:
+        # Nodes are validated as they stream, so the page goes to a temporary
+        # file first: a page that fails halfway never replaces a good one.
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                template.write(f, variables, rewrite_url)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, dest_path)
+        return meta
+    if profile is None:
+        # The compressor takes the page from memory, so it is rendered to a
+        # string rather than streamed.
+        data = template.render(variables, rewrite_url).encode()
+        with open(dest_path, "wb") as f:
+            f.write(data)
+        compressor.submit(dest_path, data)
+        return meta
+
+    # Profiling renders each stage to a string so serialize, template and
+    # write can be timed apart; the output is the same as the streamed path.
+    if isinstance(content, HTMLNode):
+        started = time.perf_counter()
+        variables["Content"] = TrustedHTML(content.to_html(rewrite_url))
+        profile.add("serialize", time.perf_counter() - started, len(variables["Content"]))
+    started = time.perf_counter()
+    page = template.render(variables, rewrite_url)
+    profile.add("template", time.perf_counter() - started, len(page))
+    started = time.perf_counter()
     with open(dest_path, "w") as f:
-        f.write(temp_f)
-
-def generate_pages_recursion(source_directory, template_path, target_directory, basepath):
-    source_list = os.listdir(source_directory)
-    for item in source_list:
+        f.write(page)
+    profile.add("write", time.perf_counter() - started, len(page))
+    if compressor is not None:
+        compressor.submit(dest_path, page.encode())
+    return meta
+
+def generate_pages_recursion(source_directory, template_path, target_directory, basepath, manifest=None, profiler=None, site=None):
+    # Sorted, so pages reach the site and search indexes in the same order as
+    # in parallel and pipelined builds.
+    for item in sorted(os.listdir(source_directory)):
         from_path = os.path.join(source_directory, item)
         dest_path = os.path.join(target_directory, item).replace(".md", ".html")
         if os.path.isfile(from_path):
             if not from_path.endswith(".md"):
                 continue
-            generate_page(from_path, template_path, dest_path, basepath)
+            if manifest is not None and manifest.is_fresh(from_path, dest_path):
+                if site is not None:
+                    site.keep(from_path, dest_path)
+                continue
+            profile = profiler.page(from_path) if profiler is not None else None
+            meta = generate_page(from_path, template_path, dest_path, basepath, profile)
             print(f"Generating {from_path} to {dest_path}")
+            if manifest is not None:
+                manifest.record(from_path, dest_path, "page")
+            if site is not None:
+                site.record(from_path, dest_path, meta)
         if os.path.isdir(from_path):
             if not os.path.isdir(dest_path):
                 os.mkdir(dest_path)
                 print(f"Creating directory {dest_path}")
-            generate_pages_recursion(from_path, template_path, dest_path, basepath)
\ No newline at end of file
+            generate_pages_recursion(from_path, template_path, dest_path, basepath, manifest, profiler, site)
\ No newline at end of file
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from conversions import basepath_rewriter, markdown_to_html_node
+from frontmatter import split_front_matter
+from inlinecache import shared_cache
+from parallel import chunk_pages
+
+# Batches smaller than this are rendered in the daemon process itself: a
+# round trip to a worker costs more than rendering them.
+FAN_OUT_BYTES = 256 * 1024
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+LATENCY_WINDOW = 10000
+PERCENTILES = (50, 90, 99)
+
+
+def render_document(markdown, basepath="/"):
+    body = split_front_matter(markdown)[1]
+    return markdown_to_html_node(body).to_html(basepath_rewriter(basepath))
+
+
+def render_chunk(documents, basepath="/"):
+    results = []
+    for markdown in documents:
+        try:
+            results.append((render_document(markdown, basepath), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def fans_out(documents, jobs):
+    return jobs > 1 and len(documents) > 1 and sum(len(markdown) for markdown in documents) >= FAN_OUT_BYTES
+
+
+def render_many(documents, basepath="/", executor=None, jobs=1):
+    # Returns one (html, error) pair per document, in order; one bad document
+    # does not fail the batch. Given an executor, large batches are split
+    # across its workers.
+    documents = list(documents)
+    if executor is None or not fans_out(documents, jobs):
+        return render_chunk(documents, basepath)
+    futures = [executor.submit(render_chunk, chunk, basepath) for chunk in chunk_pages(documents, jobs)]
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+class LatencyStats:
+    # Request latencies over a window of the most recent requests.
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.documents = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, documents=1):
+        with self.lock:
+            self.samples.append(seconds)
+            self.requests += 1
+            self.documents += documents
+
+    def percentiles(self):
+        # Nearest-rank percentiles in milliseconds.
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {f"p{p}": 0.0 for p in PERCENTILES}
+        return {f"p{p}": samples[max(0, math.ceil(p / 100 * len(samples)) - 1)] * 1000 for p in PERCENTILES}
+
+    def to_dict(self):
+        data = {"requests": self.requests, "documents": self.documents}
+        data.update(self.percentiles())
+        return data
+
+    def summary(self):
+        latency = ", ".join(f"{name} {ms:.3f} ms" for name, ms in self.percentiles().items())
+        return f"Render daemon: {self.requests} request(s), {self.documents} document(s), {latency}"
+
+
+class RenderDaemon:
+    # Keeps the interpreter, the shared inline cache and a pool of worker
+    # processes warm between requests.
+    def __init__(self, jobs=1, basepath="/"):
+        self.jobs = jobs
+        self.basepath = basepath
+        self.executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        self.stats = LatencyStats()
+        # The shared inline cache is not thread safe, so in-process renders
+        # take turns. Fanned out batches only wait on their workers.
+        self.lock = threading.Lock()
+
+    def start(self):
+        # Worker processes start on first use; pay for it before the first
+        # request instead of during it.
+        if self.executor is not None:
+            list(self.executor.map(render_chunk, [["# Warm up"]] * self.jobs))
+        return self
+
+    def render(self, documents, basepath=None):
+        basepath = basepath or self.basepath
+        if self.executor is not None and fans_out(documents, self.jobs):
+            return render_many(documents, basepath, self.executor, self.jobs)
+        with self.lock:
+            return render_chunk(documents, basepath)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    # POST /render {"documents": [markdown, ...], "basepath": "/"} answers
+    # {"results": [{"html": ...} or {"error": ...}, ...]}; GET /stats answers
+    # the request count and latency percentiles.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/render":
+            self.send_json(404, {"error": f"No such endpoint {self.path}"})
+            return
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.send_json(413, {"error": f"Request larger than {MAX_REQUEST_BYTES} bytes"})
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+            documents = request["documents"]
+            basepath = request.get("basepath")
+            if not isinstance(documents, list) or not all(isinstance(markdown, str) for markdown in documents):
+                raise ValueError("documents must be a list of strings")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        results = self.server.renderer.render(documents, basepath)
+        self.send_json(200, {"results": [{"html": html} if error is None else {"error": error} for html, error in results]})
+        self.server.renderer.stats.record(time.perf_counter() - started, len(documents))
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self.send_json(404, {"error": f"No such endpoint {self.path}"})
+            return
+        self.send_json(200, self.server.renderer.stats.to_dict())
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_render_server(renderer, port):
+    server = ThreadingHTTPServer(("localhost", port), RenderHandler)
+    server.renderer = renderer
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render markdown previews over HTTP on localhost")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8899, help="port to listen on")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="worker processes for large batches (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--inline-cache-size", type=int, default=4096,
+        help="entries in the shared inline render cache (0 disables it)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    shared_cache.maxsize = args.inline_cache_size
+    renderer = RenderDaemon(jobs, args.basepath).start()
+    server = start_render_server(renderer, args.port)
+    print(f"Rendering at http://localhost:{server.server_address[1]}/render (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        renderer.close()
+        print(renderer.stats.summary())
+
+
+if __name__ == "__main__":
+    main()
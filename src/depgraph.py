@@ -0,0 +1,154 @@
+import json
+import os
+import posixpath
+from conversions import page_text_nodes
+from frontmatter import split_front_matter
+from inlinecache import InlineCache
+from textnode import TextType
+
+DEPGRAPH_VERSION = 1
+REFERENCE_TYPES = (TextType.LINK, TextType.IMAGE)
+
+
+def page_references(markdown):
+    # Pages are read here, before the page pass, because their dependents
+    # must be invalidated before anything renders. Built-in blocks are only
+    # tokenized; a custom handler's links are read through the handler, with
+    # a disabled cache so no node built here reaches the page pass.
+    references = []
+    for node in page_text_nodes(split_front_matter(markdown)[1], InlineCache(0)):
+        if node.text_type in REFERENCE_TYPES and node.url not in references:
+            references.append(node.url)
+    return references
+
+
+def is_internal(url):
+    return not (url.startswith(("//", "#", "mailto:")) or "://" in url)
+
+
+class DependencyIndex:
+    # Which pages and static files every content page links to, and the
+    # reverse. Pages are re-indexed only when their size or mtime changes.
+    def __init__(self, content_directory, source_directory, path):
+        self.content_directory = content_directory
+        self.source_directory = source_directory
+        self.path = path
+        self.pages = {}
+        self.reverse = None
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == DEPGRAPH_VERSION:
+            self.pages = data.get("pages", {})
+            self.reverse = None
+
+    def save(self):
+        index_dir = os.path.dirname(self.path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": DEPGRAPH_VERSION, "pages": self.pages}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def scan(self):
+        sources = []
+        for root, _, names in os.walk(self.content_directory):
+            sources.extend(os.path.join(root, name) for name in names if name.endswith(".md"))
+        existing = set(sources)
+        removed = [source for source in self.pages if source not in existing]
+        return self.refresh(sources, removed)
+
+    def refresh(self, sources, removed=()):
+        # Returns the pages whose references were re-read plus the removed
+        # ones, i.e. every page whose dependents may need rebuilding.
+        changed = []
+        for source in removed:
+            if self.pages.pop(source, None) is not None:
+                self.reverse = None
+                changed.append(source)
+        for source in sources:
+            stat = os.stat(source)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            entry = self.pages.get(source)
+            if entry is not None and entry["signature"] == signature:
+                continue
+            with open(source, "r") as f:
+                try:
+                    references = page_references(f.read())
+                except ValueError:
+                    # Invalid markdown is reported by the page build itself.
+                    references = []
+            if entry is None or entry["references"] != references:
+                self.reverse = None
+            self.pages[source] = {"signature": signature, "references": references}
+            changed.append(source)
+        return changed
+
+    def candidates(self, from_path, url):
+        # Every file an internal URL could be served from, in the order they
+        # are tried; empty for external URLs.
+        if not is_internal(url):
+            return []
+        path = url.split("#", 1)[0].split("?", 1)[0]
+        if not path.startswith("/"):
+            page_directory = os.path.relpath(os.path.dirname(from_path), self.content_directory)
+            path = posixpath.join("/", page_directory.replace(os.sep, "/"), path)
+        relative = posixpath.normpath(path).strip("/")
+        if relative in ("", "."):
+            return [os.path.join(self.content_directory, "index.md"), os.path.join(self.source_directory, "index.html")]
+        if relative.endswith(".html"):
+            pages = [os.path.join(self.content_directory, relative[:-5] + ".md")]
+        else:
+            pages = [
+                os.path.join(self.content_directory, relative, "index.md"),
+                os.path.join(self.content_directory, relative + ".md"),
+            ]
+        return pages + [os.path.join(self.source_directory, relative)]
+
+    def resolve(self, from_path, url):
+        # The last candidate is always the static file.
+        candidates = self.candidates(from_path, url)
+        for candidate in candidates[:-1]:
+            if candidate in self.pages:
+                return candidate
+        if candidates and os.path.isfile(candidates[-1]):
+            return candidates[-1]
+        return None
+
+    def dependencies(self, source):
+        targets = set()
+        for url in self.pages.get(source, {}).get("references", []):
+            target = self.resolve(source, url)
+            if target is not None:
+                targets.add(target)
+        return targets
+
+    def dependents(self, paths):
+        # Keyed by every candidate rather than the resolved target, so adding
+        # a page that fixes a broken link also reaches the pages linking to it.
+        if self.reverse is None:
+            self.reverse = {}
+            for source, entry in self.pages.items():
+                for url in entry["references"]:
+                    for candidate in self.candidates(source, url):
+                        self.reverse.setdefault(candidate, set()).add(source)
+        found = set()
+        for path in paths:
+            found |= self.reverse.get(path, set())
+        return found - set(paths)
+
+    def broken_links(self):
+        broken = []
+        for source in sorted(self.pages):
+            for url in self.pages[source]["references"]:
+                if is_internal(url) and self.resolve(source, url) is None:
+                    broken.append((source, url))
+        return broken
@@ -0,0 +1,225 @@
+import struct
+import sys
+from array import array
+from blocks import Block, classify_lines, scan_blocks
+from blocktype import BlockType
+from conversions import block_to_html_node, builtin_block_type, code_block_text, heading_parts, list_items, paragraph_text, quote_text, text_node_to_html_node, text_to_textnodes
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+IR_VERSION = 1
+IR_MAGIC = b"SSGIR\n"
+IR_HEADER = struct.Struct("<HII")
+STRING_LENGTH = struct.Struct("<I")
+NO_VALUE = -1
+
+# Node kinds, stored as one byte each. Block kinds first, then one inline
+# kind per TextType in declaration order.
+DOCUMENT = 0
+PARAGRAPH = 1
+HEADING = 2
+CODE_BLOCK = 3
+QUOTE = 4
+UNORDERED_LIST = 5
+ORDERED_LIST = 6
+LIST_ITEM = 7
+# A block claimed by a detector or by a handler that replaced a built-in
+# one, kept as its source text and handed back to block_to_html_node when
+# rendered.
+RAW_BLOCK = 8
+INLINE_KINDS = {text_type: 9 + i for i, text_type in enumerate(TextType)}
+INLINE_TYPES = {kind: text_type for text_type, kind in INLINE_KINDS.items()}
+BLOCK_TAGS = {
+    DOCUMENT: "div",
+    PARAGRAPH: "p",
+    QUOTE: "blockquote",
+    UNORDERED_LIST: "ul",
+    ORDERED_LIST: "ol",
+    LIST_ITEM: "li",
+}
+LIST_KINDS = {BlockType.UNORDERED_LIST: UNORDERED_LIST, BlockType.ORDERED_LIST: ORDERED_LIST}
+
+
+class Document:
+    # A parsed page as parallel flat arrays in pre-order: node i has kind
+    # kinds[i], its parent at parents[i] (-1 for the root), a heading level,
+    # and text and url as indices into one deduplicated string table.
+    __slots__ = ("kinds", "parents", "levels", "texts", "urls", "strings", "string_ids")
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.parents = array("i")
+        self.levels = array("B")
+        self.texts = array("i")
+        self.urls = array("i")
+        self.strings = []
+        self.string_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Document)
+            and self.kinds == other.kinds
+            and self.parents == other.parents
+            and self.levels == other.levels
+            and [self.text(i) for i in range(len(self))] == [other.text(i) for i in range(len(other))]
+            and [self.url(i) for i in range(len(self))] == [other.url(i) for i in range(len(other))]
+        )
+
+    def string(self, value):
+        if value is None:
+            return NO_VALUE
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def add(self, kind, parent, text=None, url=None, level=0):
+        self.kinds.append(kind)
+        self.parents.append(parent)
+        self.levels.append(level)
+        self.texts.append(self.string(text))
+        self.urls.append(self.string(url))
+        return len(self.kinds) - 1
+
+    def text(self, index):
+        string_id = self.texts[index]
+        return None if string_id == NO_VALUE else self.strings[string_id]
+
+    def url(self, index):
+        string_id = self.urls[index]
+        return None if string_id == NO_VALUE else self.strings[string_id]
+
+    def children(self):
+        children = [[] for _ in range(len(self))]
+        for index in range(1, len(self)):
+            children[self.parents[index]].append(index)
+        return children
+
+    def text_nodes(self):
+        for index, kind in enumerate(self.kinds):
+            if kind in INLINE_TYPES:
+                yield TextNode(self.text(index), INLINE_TYPES[kind], self.url(index))
+
+    def to_html_node(self):
+        # Children always follow their parent, so walking backwards builds
+        # every node after all of its children.
+        children = self.children()
+        nodes = [None] * len(self)
+        for index in range(len(self) - 1, -1, -1):
+            kind = self.kinds[index]
+            if kind in INLINE_TYPES:
+                nodes[index] = text_node_to_html_node(TextNode(self.text(index), INLINE_TYPES[kind], self.url(index)))
+            elif kind == RAW_BLOCK:
+                lines = self.text(index).split("\n")
+                nodes[index] = block_to_html_node(Block(classify_lines(lines), 0, len(lines), lines))
+            elif kind == CODE_BLOCK:
+                nodes[index] = ParentNode("pre", [ParentNode("code", [LeafNode(None, self.text(index))])])
+            elif kind == HEADING:
+                nodes[index] = ParentNode(f"h{self.levels[index]}", [nodes[child] for child in children[index]])
+            else:
+                nodes[index] = ParentNode(BLOCK_TAGS[kind], [nodes[child] for child in children[index]])
+        return nodes[0]
+
+    def to_text(self):
+        # Plain text for search and previews: inline text joined per block,
+        # blocks and list items one per line, images by their alt text.
+        lines = []
+        current = None
+        for index, kind in enumerate(self.kinds):
+            if kind in (CODE_BLOCK, RAW_BLOCK):
+                lines.append(self.text(index))
+                current = None
+            elif kind in INLINE_TYPES:
+                parent = self.parents[index]
+                if parent != current:
+                    lines.append("")
+                    current = parent
+                lines[-1] += self.text(index)
+        return "\n".join(lines)
+
+    def to_bytes(self):
+        parts = [IR_MAGIC, IR_HEADER.pack(IR_VERSION, len(self), len(self.strings))]
+        for value in self.strings:
+            encoded = value.encode()
+            parts.append(STRING_LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        parts.append(self.kinds.tobytes())
+        parts.append(self.levels.tobytes())
+        for values in (self.parents, self.texts, self.urls):
+            if sys.byteorder == "big":
+                values = array("i", values)
+                values.byteswap()
+            parts.append(values.tobytes())
+        return b"".join(parts)
+
+    def __reduce__(self):
+        # Pickled as its binary form, so handing a document to another
+        # process copies a few buffers instead of a graph of objects.
+        return (Document.from_bytes, (self.to_bytes(),))
+
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            return cls.read(memoryview(data))
+        except (struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Corrupt document IR: {e}") from e
+
+    @classmethod
+    def read(cls, data):
+        if bytes(data[:len(IR_MAGIC)]) != IR_MAGIC:
+            raise ValueError("Not a document IR")
+        offset = len(IR_MAGIC)
+        version, count, string_count = IR_HEADER.unpack_from(data, offset)
+        if version != IR_VERSION:
+            raise ValueError(f"Unsupported document IR version {version}")
+        offset += IR_HEADER.size
+        document = cls()
+        for _ in range(string_count):
+            (length,) = STRING_LENGTH.unpack_from(data, offset)
+            offset += STRING_LENGTH.size
+            document.string(str(data[offset:offset + length], "utf-8"))
+            offset += length
+        for name, typecode, size in (("kinds", "B", 1), ("levels", "B", 1), ("parents", "i", 4), ("texts", "i", 4), ("urls", "i", 4)):
+            values = array(typecode)
+            values.frombytes(data[offset:offset + count * size])
+            if size > 1 and sys.byteorder == "big":
+                values.byteswap()
+            if len(values) != count:
+                raise ValueError("Truncated document IR")
+            setattr(document, name, values)
+            offset += count * size
+        return document
+
+
+def add_inline(document, parent, text):
+    for node in text_to_textnodes(text):
+        document.add(INLINE_KINDS[node.text_type], parent, node.text, node.url)
+
+
+def markdown_to_document(markdown):
+    # Built from the block scan and the inline tokens, with the same helpers
+    # the built-in handlers use; any other block is kept raw.
+    document = Document()
+    root = document.add(DOCUMENT, NO_VALUE)
+    for block in scan_blocks(markdown):
+        block_type = builtin_block_type(block)
+        if block_type is None:
+            document.add(RAW_BLOCK, root, block.text)
+        elif block_type == BlockType.CODE:
+            document.add(CODE_BLOCK, root, code_block_text(block))
+        elif block_type == BlockType.HEADING:
+            level, text = heading_parts(block)
+            add_inline(document, document.add(HEADING, root, level=level), text)
+        elif block_type == BlockType.PARAGRAPH:
+            add_inline(document, document.add(PARAGRAPH, root), paragraph_text(block))
+        elif block_type == BlockType.QUOTE:
+            add_inline(document, document.add(QUOTE, root), quote_text(block))
+        else:
+            list_node = document.add(LIST_KINDS[block_type], root)
+            for item in list_items(block.lines):
+                add_inline(document, document.add(LIST_ITEM, list_node), item)
+    return document
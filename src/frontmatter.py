@@ -0,0 +1,108 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+FRONT_MATTER_DELIMITER = "---"
+FRONT_MATTER_CLOSE_PATTERN = re.compile(r"^---[^\S\n]*$", re.MULTILINE)
+FRONT_MATTER_LINE_PATTERN = re.compile(r"(\w[\w-]*)\s*:\s*(.*)")
+MAX_FRONT_MATTER_BYTES = 64 * 1024
+
+
+def parse_value(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.startswith("[") and value.endswith("]"):
+        return [parse_value(item.strip()) for item in value[1:-1].split(",") if item.strip()]
+    return value
+
+
+def parse_front_matter(lines):
+    # A small YAML subset: "key: value" pairs, quoted strings, inline
+    # [a, b] lists and "- item" lists under an empty key.
+    meta = {}
+    key = None
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None and isinstance(meta[key], list):
+            meta[key].append(parse_value(stripped[2:].strip()))
+            continue
+        match = FRONT_MATTER_LINE_PATTERN.fullmatch(stripped)
+        if match is None:
+            raise ValueError(f"Invalid front matter on line {number}: {stripped}")
+        key, value = match.group(1), match.group(2).strip()
+        meta[key] = parse_value(value) if value else []
+    return meta
+
+
+def is_delimiter(line):
+    return FRONT_MATTER_CLOSE_PATTERN.fullmatch(line) is not None
+
+
+def opens_front_matter(line):
+    # A page that starts with a thematic break is still plain markdown; only
+    # a "key: value" line right after the opening --- starts front matter.
+    return FRONT_MATTER_LINE_PATTERN.fullmatch(line.strip()) is not None
+
+
+def split_front_matter(markdown):
+    if not markdown.startswith(FRONT_MATTER_DELIMITER):
+        return {}, markdown
+    first_end = markdown.find("\n")
+    if first_end == -1 or not is_delimiter(markdown[:first_end]):
+        return {}, markdown
+    second_end = markdown.find("\n", first_end + 1)
+    if second_end == -1 or not opens_front_matter(markdown[first_end + 1:second_end]):
+        return {}, markdown
+    close = FRONT_MATTER_CLOSE_PATTERN.search(markdown, second_end + 1)
+    if close is None:
+        return {}, markdown
+    meta = parse_front_matter(markdown[first_end + 1:close.start()].split("\n"))
+    return meta, markdown[close.end() + 1:]
+
+
+def read_metadata(path, max_bytes=MAX_FRONT_MATTER_BYTES):
+    # Reads only up to the closing delimiter; the body is never loaded.
+    # Opening and closing lines follow the same rules as split_front_matter.
+    with open(path, "rb") as f:
+        if f.readline(len(FRONT_MATTER_DELIMITER)) != FRONT_MATTER_DELIMITER.encode():
+            return {}
+        f.seek(0)
+        lines = []
+        size = 0
+        while size < max_bytes:
+            line = f.readline(max_bytes - size)
+            if not line:
+                return {}
+            size += len(line)
+            line = line.decode().rstrip("\n")
+            if not lines:
+                if not is_delimiter(line):
+                    return {}
+            elif len(lines) == 1 and not opens_front_matter(line):
+                return {}
+            elif is_delimiter(line):
+                return parse_front_matter(lines[1:])
+            lines.append(line)
+    return {}
+
+
+def scan_metadata(content_directory, jobs=8):
+    paths = []
+    for root, _, names in os.walk(content_directory):
+        paths.extend(os.path.join(root, name) for name in names if name.endswith(".md"))
+    paths.sort()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(zip(paths, executor.map(read_metadata, paths)))
+
+
+def template_variables(meta):
+    # Front matter keys are exposed to the template capitalized, like the
+    # built-in Title and Content, so "date: ..." fills {{ Date }}.
+    variables = {}
+    for key, value in meta.items():
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        variables[key[:1].upper() + key[1:]] = value
+    return variables
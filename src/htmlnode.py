@@ -1,21 +1,76 @@
+from functools import lru_cache
 
+URL_PROPS = ("href", "src")
+URL_LIST_PROPS = ("srcset",)
+
+def escape_text(value):
+    # Most text has nothing to escape, and three membership tests cost far
+    # less than building a copy of it.
+    if "&" in value or "<" in value or ">" in value:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return value
+
+@lru_cache(maxsize=4096)
+def escape_attribute(value):
+    # Attribute values repeat across a site (URLs, class names, image sizes),
+    # so escaped values are memoized, and only a miss pays for str().
+    value = str(value)
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    return value
+
+def rewrite_url_list(value, rewrite_url):
+    # srcset: comma separated "url descriptor" candidates.
+    candidates = []
+    for candidate in value.split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        candidates.append(f"{rewrite_url(url)} {descriptor}" if descriptor else rewrite_url(url))
+    return ", ".join(candidates)
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, rewrite_url=None):
         raise NotImplementedError
 
-    def props_to_html(self):
+    def iter_html(self, rewrite_url=None):
+        # Depth-first walk with an explicit stack so deeply nested trees never
+        # hit the recursion limit. Closing tags are pushed as plain strings;
+        # children are checked before they are pushed, so any string on the
+        # stack is always markup ready to be emitted.
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                node.validate()
+                yield f"<{node.tag}{node.props_to_html(rewrite_url)}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.to_html(rewrite_url)
+
+    def write_html(self, fp, rewrite_url=None):
+        for fragment in self.iter_html(rewrite_url):
+            fp.write(fragment)
+
+    def props_to_html(self, rewrite_url=None):
         if self.props == None or self.props == {}:
             return ""
         prop_list = []
         for key, value in self.props.items():
-            prop_list.append(f'{key}="{value}"')
+            if rewrite_url is not None and key in URL_PROPS:
+                value = rewrite_url(value)
+            elif rewrite_url is not None and key in URL_LIST_PROPS:
+                value = rewrite_url_list(value, rewrite_url)
+            prop_list.append(f'{key}="{escape_attribute(value)}"')
         result = " ".join(prop_list)
         return f" {result}"
 
@@ -23,32 +78,40 @@ class HTMLNode:
         return f" tag = {self.tag}, value = {self.value}, children = {self.children}, props = {self.props}"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def to_html(self, rewrite_url=None):
         if self.value is None:
             raise ValueError("Leaf nodes must have a value")
+        value = self.value
+        if value.__class__ is not str:
+            value = str(value)
+        # The common case, nothing to escape, stays inline.
+        if "&" in value or "<" in value or ">" in value:
+            value = escape_text(value)
         if self.tag is None:
-            return f"{self.value}"
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            return value
+        return f"<{self.tag}{self.props_to_html(rewrite_url)}>{value}</{self.tag}>"
 
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def validate(self):
         if self.tag is None:
             raise ValueError("Tag is required")
         if self.children is None or self.children == []:
             raise ValueError("Parent nodes must have children")
-
-        results = ""
         for child in self.children:
             if not isinstance(child, HTMLNode):
                 raise ValueError("Child is not a valid HTMLNode")
-            results = results + child.to_html()
 
-        return f"<{self.tag}>{results}</{self.tag}>"
\ No newline at end of file
+    def to_html(self, rewrite_url=None):
+        return "".join(self.iter_html(rewrite_url))
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+IMAGE_INDEX_VERSION = 1
+DEFAULT_WIDTHS = (480, 960)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carry the dimensions; C4, C8 and CC share the
+# range but are not frames.
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Root-relative image URL to the attributes its <img> nodes are annotated
+# with. text_node_to_html_node reads it while it is populated.
+active_images = {}
+
+
+def image_size(path):
+    # Width and height from the file header alone, without decoding pixels.
+    with open(path, "rb") as f:
+        header = f.read(32)
+        if header.startswith(PNG_SIGNATURE) and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header[:2] == b"\xff\xd8":
+            f.seek(2)
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF:
+                    return None
+                length = struct.unpack(">H", marker[2:4])[0]
+                if marker[1] in JPEG_SOF_MARKERS:
+                    height, width = struct.unpack(">xHH", f.read(5))
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def derivative_name(relative, digest, width):
+    stem, _, extension = relative.rpartition(".")
+    return f"{stem}.{digest[:8]}.{width}w.{extension}"
+
+
+def process_image(from_path, digest, cache_directory, widths):
+    # Runs in a worker process. Derivatives are only made when Pillow is
+    # installed; without it the image is measured and left as it is.
+    size = image_size(from_path)
+    if size is None:
+        return None
+    width, height = size
+    derivatives = []
+    if Image is not None:
+        os.makedirs(cache_directory, exist_ok=True)
+        with Image.open(from_path) as image:
+            for target in sorted(w for w in widths if w < width):
+                cache_path = os.path.join(cache_directory, f"{digest}-{target}{os.path.splitext(from_path)[1]}")
+                if not os.path.exists(cache_path):
+                    resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+                    tmp_path = f"{cache_path}.{os.getpid()}.tmp{os.path.splitext(from_path)[1]}"
+                    resized.save(tmp_path, optimize=True)
+                    os.replace(tmp_path, cache_path)
+                derivatives.append(target)
+    return {"width": width, "height": height, "derivatives": derivatives}
+
+
+class ImageStage:
+    # Measures every image under static/ and, with Pillow, writes resized
+    # copies next to it. Results are cached in .build/images by source hash,
+    # so only new or changed images reach the process pool.
+    def __init__(self, source_directory, target_directory, manifest, cache_directory, widths=DEFAULT_WIDTHS, jobs=1):
+        self.source_directory = source_directory
+        self.target_directory = target_directory
+        self.manifest = manifest
+        self.cache_directory = cache_directory
+        self.widths = tuple(widths)
+        self.jobs = jobs
+        self.index_path = os.path.join(cache_directory, "index.json")
+        self.index = {}
+        self.attributes = {}
+        self.outputs = []
+        self.token = ""
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != IMAGE_INDEX_VERSION or data.get("widths") != list(self.widths):
+            return
+        self.index = data.get("images", {})
+        self.attributes = data.get("attributes", {})
+        self.outputs = data.get("outputs", [])
+
+    def save(self):
+        os.makedirs(self.cache_directory, exist_ok=True)
+        data = {
+            "version": IMAGE_INDEX_VERSION,
+            "widths": list(self.widths),
+            "images": self.index,
+            "attributes": self.attributes,
+            "outputs": self.outputs,
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def scan(self):
+        images = []
+        for root, _, names in os.walk(self.source_directory):
+            for name in sorted(names):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(os.path.join(root, name))
+        return sorted(images)
+
+    def run(self):
+        # Returns the images whose attributes changed since the last run,
+        # including removed ones, so the pages showing them can be rebuilt.
+        images = [(path, self.manifest.digest(path)) for path in self.scan()]
+        pending = [(path, digest) for path, digest in images if digest not in self.index]
+        # Measuring alone only reads headers; the pool pays off once Pillow
+        # has pixels to resample.
+        if Image is not None and self.jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [
+                    executor.submit(process_image, path, digest, self.cache_directory, self.widths)
+                    for path, digest in pending
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [process_image(path, digest, self.cache_directory, self.widths) for path, digest in pending]
+        for (_, digest), info in zip(pending, results):
+            self.index[digest] = info
+        self.index = {digest: self.index[digest] for _, digest in images}
+
+        attributes = {}
+        outputs = []
+        for path, digest in images:
+            info = self.index[digest]
+            if info is None:
+                continue
+            relative = os.path.relpath(path, self.source_directory).replace(os.sep, "/")
+            image_attributes = {"width": str(info["width"]), "height": str(info["height"]), "loading": "lazy"}
+            candidates = []
+            for width in info["derivatives"]:
+                name = derivative_name(relative, digest, width)
+                dest_path = os.path.join(self.target_directory, *name.split("/"))
+                if not os.path.exists(dest_path):
+                    cache_path = os.path.join(self.cache_directory, f"{digest}-{width}{os.path.splitext(path)[1]}")
+                    shutil.copyfile(cache_path, dest_path)
+                candidates.append(f"/{name} {width}w")
+                outputs.append(name)
+            if candidates:
+                candidates.append(f"/{relative} {info['width']}w")
+                image_attributes["srcset"] = ", ".join(candidates)
+            attributes["/" + relative] = image_attributes
+
+        for name in set(self.outputs) - set(outputs):
+            stale_path = os.path.join(self.target_directory, *name.split("/"))
+            if os.path.isfile(stale_path):
+                os.remove(stale_path)
+        changed = [
+            os.path.join(self.source_directory, *url[1:].split("/"))
+            for url in sorted(set(attributes) | set(self.attributes))
+            if attributes.get(url) != self.attributes.get(url)
+        ]
+        self.attributes = attributes
+        self.outputs = sorted(outputs)
+        if pending or changed:
+            self.save()
+        active_images.clear()
+        active_images.update(attributes)
+        # Cached page bodies and inline fragments carry these attributes, so
+        # callers fold the token into their cache keys.
+        self.token = hashlib.sha256(json.dumps(attributes, sort_keys=True).encode()).hexdigest()
+        return changed
@@ -0,0 +1,84 @@
+import json
+import os
+from collections import OrderedDict
+from textnode import TextNode, TextType
+
+INLINE_CACHE_VERSION = 1
+
+
+class InlineCache:
+    # Bounded LRU map from inline markdown source to its parsed TextNodes and
+    # rendered HTML leaf nodes. Cached nodes are shared between pages, so they
+    # must never be mutated after they are stored.
+    def __init__(self, maxsize=4096, max_text_length=2048):
+        self.maxsize = maxsize
+        self.max_text_length = max_text_length
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, text):
+        entry = self.entries.get(text)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(text)
+        self.hits += 1
+        return entry
+
+    def enabled(self):
+        return self.maxsize > 0
+
+    def put(self, text, text_nodes, html_nodes):
+        # Long unique paragraphs would only push the short repeated fragments
+        # this cache is for out of the LRU.
+        if self.maxsize <= 0 or len(text) > self.max_text_length:
+            return
+        self.entries[text] = (tuple(text_nodes), tuple(html_nodes))
+        self.entries.move_to_end(text)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return f"Inline cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {len(self)} entries"
+
+    def save(self, path):
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        entries = [
+            [text, [[node.text, node.text_type.value, node.url] for node in text_nodes]]
+            for text, (text_nodes, _) in self.entries.items()
+        ]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": INLINE_CACHE_VERSION, "entries": entries}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path, to_html_node):
+        # Only the TextNodes are stored on disk; the HTML nodes are rebuilt
+        # with to_html_node so the file stays independent of the serializer.
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get("version") != INLINE_CACHE_VERSION:
+            return 0
+        for text, nodes in data.get("entries", [])[-self.maxsize:]:
+            text_nodes = [TextNode(node_text, TextType(text_type), url) for node_text, text_type, url in nodes]
+            self.put(text, text_nodes, [to_html_node(node) for node in text_nodes])
+        return len(self.entries)
+
+
+shared_cache = InlineCache()
@@ -1,24 +1,218 @@
 #!/usr/bin/env python3
+import argparse
 import os
-import sys
-import shutil
+from assets import AssetPipeline, remove_fingerprints
 from conversions import *
+from buildprofile import BuildProfiler
+import compress
+from depgraph import DependencyIndex
+from images import ImageStage
+from inlinecache import shared_cache
+from manifest import BuildManifest
+import pagecache
+import search
+from parallel import collect_pages, generate_pages_parallel
+from siteindex import SiteArtifacts, SiteIndex
+from sync import LINK_MODES
+from watch import SiteWatcher, watch
+from writer import PageWriter, generate_pages_pipelined
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="number of worker processes for page generation (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--sync-jobs", type=int, default=8,
+        help="threads used to copy static files",
+    )
+    parser.add_argument(
+        "--link-mode", choices=LINK_MODES, default="copy",
+        help="copy static files, hard link them, or clone them with reflinks where supported",
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="render pages into a bounded queue drained by a single writer thread",
+    )
+    parser.add_argument(
+        "--write-queue", type=int, default=64,
+        help="rendered pages the --pipeline queue holds before renderers wait",
+    )
+    parser.add_argument(
+        "--atomic-writes", action="store_true",
+        help="have the --pipeline writer write to a temporary file and rename it into place",
+    )
+    parser.add_argument(
+        "--fingerprint", action="store_true",
+        help="also write content-hashed copies of static files and point page and template URLs at them",
+    )
+    parser.add_argument(
+        "--images", action="store_true",
+        help="annotate <img> with width, height and loading=lazy, and with Pillow installed add resized srcset copies",
+    )
+    parser.add_argument(
+        "--image-widths", default="480,960",
+        help="comma separated widths of the resized copies made by --images",
+    )
+    parser.add_argument(
+        "--compress", action="store_true",
+        help="write a .gz next to every page and compressible asset, skipping outputs unchanged since the last build",
+    )
+    parser.add_argument(
+        "--compress-level", type=int, default=9, choices=range(1, 10), metavar="1-9",
+        help="gzip level used by --compress",
+    )
+    parser.add_argument(
+        "--inline-cache-size", type=int, default=4096,
+        help="entries in the shared inline render cache (0 disables it)",
+    )
+    parser.add_argument(
+        "--persist-inline-cache", action="store_true",
+        help="load and save the inline render cache in ./.build between builds",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="do not read or write the on-disk cache of rendered page bodies",
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=512,
+        help="size limit of the page body cache in MB",
+    )
+    parser.add_argument(
+        "--site-url",
+        help="absolute URL the site is served from, e.g. https://example.com; enables sitemap.xml and feed.xml",
+    )
+    parser.add_argument(
+        "--feed-author",
+        help="author named in feed.xml for posts without an author in front matter (default: the feed title)",
+    )
+    parser.add_argument(
+        "--listings", action="store_true",
+        help="generate listing pages for directories without an index page, and tag pages",
+    )
+    parser.add_argument(
+        "--search", action="store_true",
+        help="build a sharded client-side search index into ./docs/search while pages render",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="serve ./docs and rebuild changed files until interrupted",
+    )
+    parser.add_argument("--port", type=int, default=8888, help="port for the --watch server")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="time every page stage and print the slowest pages",
+    )
+    parser.add_argument("--profile-top", type=int, default=10, help="pages listed in the --profile summary")
+    parser.add_argument(
+        "--profile-trace", default=os.path.relpath("./.build/profile.json"),
+        help="where --profile writes its JSON trace",
+    )
+    args = parser.parse_args()
+    if args.pipeline and args.profile:
+        parser.error("--profile times pages as they are written and cannot be combined with --pipeline")
+    return args
 
 
 def main():
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    else:
-        basepath = "/"
+    args = parse_args()
+    basepath = args.basepath
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
     source_directory = os.path.relpath("./static")
     target_directory = os.path.relpath("./docs")
     content_directory = os.path.relpath("./content")
     template_path = os.path.relpath("./template.html")
-    if os.path.exists(target_directory):
-        shutil.rmtree(target_directory)
-    os.mkdir(target_directory)
-    copy_files_recursion(source_directory, target_directory)
-    generate_pages_recursion(content_directory, template_path, target_directory, basepath)
+    manifest_path = os.path.relpath("./.build/manifest.json")
+    index_path = os.path.relpath("./.build/depgraph.json")
+    site_index_path = os.path.relpath("./.build/site-index.json")
+    inline_cache_path = os.path.relpath("./.build/inline-cache.json")
+    image_cache_directory = os.path.relpath("./.build/images")
+    compress_index_path = os.path.relpath("./.build/compress.json")
+    search_index_path = os.path.relpath("./.build/search-index.json")
+    page_cache_directory = None if args.no_cache else os.path.relpath("./.build/pages")
+    page_cache = pagecache.configure(page_cache_directory, args.cache_size * 1024 * 1024)
+    shared_cache.maxsize = args.inline_cache_size
+    os.makedirs(target_directory, exist_ok=True)
+    compressor = compress.configure(target_directory, compress_index_path, os.cpu_count() or 1, args.compress_level) if args.compress else None
+    manifest = BuildManifest(manifest_path)
+    search_index = search.configure(search_index_path if args.search else None, target_directory, basepath)
+    image_widths = [int(width) for width in args.image_widths.split(",") if width]
+    image_stage = ImageStage(source_directory, target_directory, manifest, image_cache_directory, image_widths, jobs) if args.images else None
+    asset_pipeline = AssetPipeline(source_directory, target_directory, manifest, args.sync_jobs, args.link_mode) if args.fingerprint else None
+    index = DependencyIndex(content_directory, source_directory, index_path)
+    site = SiteIndex(site_index_path, target_directory)
+    artifacts = SiteArtifacts(site, template_path, basepath, args.site_url, args.listings, feed_author=args.feed_author)
+    profiler = BuildProfiler() if args.profile else None
+    try:
+        copy_files_recursion(source_directory, target_directory, manifest, args.sync_jobs, args.link_mode)
+        changed = []
+        if image_stage is not None:
+            changed += image_stage.run()
+            if page_cache is not None:
+                page_cache.salt = image_stage.token
+        # Inline fragments are rebuilt into nodes on load, so they must be
+        # loaded once the image attributes are known.
+        if args.persist_inline_cache:
+            shared_cache.load(inline_cache_path, text_node_to_html_node)
+        if asset_pipeline is not None:
+            changed += asset_pipeline.run()
+            manifest.begin(template_path, basepath, asset_pipeline.template_fingerprints(template_path))
+        else:
+            changed += remove_fingerprints(source_directory, target_directory)
+            manifest.begin(template_path, basepath)
+        # Scanned once image attributes and fingerprints are in place.
+        changed += index.scan()
+        for dependent in index.dependents(changed):
+            manifest.invalidate(dependent)
+        for source, url in index.broken_links():
+            print(f"Broken link in {source}: {url}")
+        if args.pipeline:
+            writer = PageWriter(args.write_queue, atomic=args.atomic_writes).start()
+            pages = collect_pages(content_directory, target_directory)
+            generate_pages_pipelined(pages, template_path, basepath, writer, jobs, manifest, site)
+            print(writer.summary())
+        elif jobs > 1:
+            pages = collect_pages(content_directory, target_directory)
+            generate_pages_parallel(pages, template_path, basepath, jobs, manifest, profiler, site)
+        else:
+            generate_pages_recursion(content_directory, template_path, target_directory, basepath, manifest, profiler, site)
+        for removed in manifest.prune(target_directory):
+            print(f"Removing orphaned output {removed}")
+        site.prune()
+        for path in artifacts.write():
+            print(f"Updating {path}" if os.path.exists(path) else f"Removing {path}")
+        # Written before the sweep so the new shards are compressed too.
+        if search_index is not None:
+            search_index.flush()
+        if compressor is not None:
+            compressor.sweep()
+    finally:
+        manifest.save()
+        index.save()
+        site.save()
+        if search_index is not None:
+            search_index.save()
+        if compressor is not None:
+            compressor.save()
+    if shared_cache.hits or shared_cache.misses:
+        print(shared_cache.summary())
+    if page_cache is not None:
+        if page_cache.hits or page_cache.misses:
+            print(page_cache.summary())
+        page_cache.evict()
+    if compressor is not None:
+        print(compressor.summary())
+    if args.persist_inline_cache and shared_cache.enabled():
+        shared_cache.save(inline_cache_path)
+    if profiler is not None:
+        print(profiler.summary(args.profile_top))
+        profiler.write_trace(args.profile_trace)
+    if args.watch:
+        watcher = SiteWatcher(content_directory, source_directory, template_path, target_directory, basepath, manifest, index, artifacts, asset_pipeline, image_stage, args.link_mode)
+        watch(watcher, args.port)
 
 
 
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+from pagecache import PARSER_VERSION
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.settings = {}
+        self.seen = set()
+        self.digests = {}
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        self.entries = data.get("entries", {})
+        self.settings = data.get("settings", {})
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "entries": self.entries,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def digest(self, source, stat=None):
+        # Keyed by size and mtime as well as path so a long-lived manifest
+        # (watch mode) never returns the hash of an older version of a file.
+        if stat is None:
+            stat = os.stat(source)
+        key = (source, stat.st_size, stat.st_mtime_ns)
+        if key not in self.digests:
+            # A recorded hash is reused across builds while size and mtime
+            # still match, just as is_fresh trusts them.
+            entry = self.entries.get(source)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+                self.digests[key] = entry["hash"]
+            else:
+                self.digests[key] = hash_file(source)
+        return self.digests[key]
+
+    def begin(self, template_path, basepath, assets=None):
+        # Every page embeds the template and the basepath, and the
+        # fingerprinted URLs of the assets the template links, so a change to
+        # any of them invalidates all of them. So does a serializer change.
+        settings = {"template": self.digest(template_path), "basepath": basepath, "parser": PARSER_VERSION}
+        if assets:
+            settings["assets"] = assets
+        if settings != self.settings:
+            for source in [s for s, e in self.entries.items() if e["kind"] == "page"]:
+                del self.entries[source]
+            self.settings = settings
+        self.record(template_path, None, "template")
+
+    def is_fresh(self, source, output):
+        self.seen.add(source)
+        entry = self.entries.get(source)
+        if entry is None or entry["output"] != output:
+            return False
+        if output is not None and not os.path.exists(output):
+            return False
+        stat = os.stat(source)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return True
+        if entry["hash"] != self.digest(source, stat):
+            return False
+        entry["size"] = stat.st_size
+        entry["mtime"] = stat.st_mtime_ns
+        return True
+
+    def needs_record(self, source, output, stat):
+        entry = self.entries.get(source)
+        return (
+            entry is None
+            or entry["output"] != output
+            or entry["size"] != stat.st_size
+            or entry["mtime"] != stat.st_mtime_ns
+        )
+
+    def record(self, source, output, kind):
+        self.seen.add(source)
+        stat = os.stat(source)
+        self.entries[source] = {
+            "kind": kind,
+            "hash": self.digest(source, stat),
+            "output": output,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+        }
+
+    def invalidate(self, source):
+        # Forces the next freshness check for source to fail without
+        # touching its output.
+        self.entries.pop(source, None)
+
+    def remove(self, source, target_directory):
+        self.seen.discard(source)
+        entry = self.entries.pop(source, None)
+        if entry is None or entry["output"] is None:
+            return None
+        output = entry["output"]
+        if not os.path.isfile(output):
+            return None
+        os.remove(output)
+        remove_empty_dirs(os.path.dirname(output), target_directory)
+        return output
+
+    def prune(self, target_directory):
+        removed = []
+        for source in [s for s in self.entries if s not in self.seen]:
+            output = self.remove(source, target_directory)
+            if output is not None:
+                removed.append(output)
+        return removed
+
+
+def remove_empty_dirs(directory, stop_directory):
+    stop_directory = os.path.normpath(stop_directory)
+    directory = os.path.normpath(directory)
+    while directory != stop_directory and directory.startswith(stop_directory + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
@@ -0,0 +1,124 @@
+import hashlib
+import mmap
+import os
+import re
+from html import unescape
+from htmlnode import escape_attribute
+
+# Bump whenever a parser or serializer change alters rendered bodies, so stale
+# entries stop matching instead of being served.
+PARSER_VERSION = "3"
+CACHE_MAGIC = b"SSGPAGE1\n"
+
+# Bodies are cached with every href/src URL wrapped in these markers, so a
+# different basepath (or any other URL rewrite) can be applied to a cached
+# body without touching text that merely looks like a URL.
+URL_START = "\x00"
+URL_END = "\x01"
+URL_MARKER_PATTERN = re.compile("\x00([^\x00\x01]*)\x01")
+
+
+def mark_url(url):
+    return f"{URL_START}{url}{URL_END}"
+
+
+def unmark_urls(body, rewrite_url=None):
+    if rewrite_url is None:
+        return body.replace(URL_START, "").replace(URL_END, "")
+    # Marked URLs were escaped as attribute values; the rewrite sees the URL
+    # itself and its result is escaped in turn.
+    return URL_MARKER_PATTERN.sub(lambda match: escape_attribute(rewrite_url(unescape(match.group(1)))), body)
+
+
+class PageCache:
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Anything besides the markdown that changes rendered bodies, such as
+        # the image attributes of the image stage.
+        self.salt = ""
+
+    def key(self, markdown, handlers=""):
+        # handlers names the registered block handlers and detectors, so
+        # registering or replacing one stops earlier bodies from matching.
+        digest = hashlib.sha256(PARSER_VERSION.encode())
+        digest.update(b"\0")
+        digest.update(self.salt.encode())
+        digest.update(b"\0")
+        digest.update(handlers.encode())
+        digest.update(b"\0")
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def cacheable(self, markdown):
+        return URL_START not in markdown and URL_END not in markdown
+
+    def get(self, markdown, handlers=""):
+        path = self.path(self.key(markdown, handlers))
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                    self.misses += 1
+                    return None
+                title_end = data.find(b"\n", len(CACHE_MAGIC))
+                if title_end == -1:
+                    self.misses += 1
+                    return None
+                title = data[len(CACHE_MAGIC):title_end].decode()
+                body = data[title_end + 1:].decode()
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # Touch the entry so eviction drops the least recently used first.
+        os.utime(path)
+        self.hits += 1
+        return title, body
+
+    def put(self, markdown, title, body, handlers=""):
+        path = self.path(self.key(markdown, handlers))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(CACHE_MAGIC)
+            f.write(title.encode())
+            f.write(b"\n")
+            f.write(body.encode())
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def summary(self):
+        return f"Page cache: {self.hits} hits, {self.misses} misses"
+
+
+active_cache = None
+
+
+def configure(directory, max_bytes=512 * 1024 * 1024):
+    global active_cache
+    active_cache = PageCache(directory, max_bytes) if directory is not None else None
+    return active_cache
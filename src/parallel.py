@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import assets
+import compress
+import conversions
+import images
+import pagecache
+import search
+from buildprofile import PageProfile
+from conversions import generate_page
+from inlinecache import shared_cache
+
+
+def collect_pages(source_directory, target_directory):
+    pages = []
+    for item in sorted(os.listdir(source_directory)):
+        from_path = os.path.join(source_directory, item)
+        dest_path = os.path.join(target_directory, item).replace(".md", ".html")
+        if os.path.isfile(from_path) and from_path.endswith(".md"):
+            pages.append((from_path, dest_path))
+        elif os.path.isdir(from_path):
+            pages.extend(collect_pages(from_path, dest_path))
+    return pages
+
+
+def worker_state():
+    # Everything the build configured that rendering reads from module
+    # globals. It is handed to every worker explicitly, because workers
+    # started with spawn or forkserver do not inherit the build's globals.
+    return (
+        dict(assets.active_fingerprints),
+        dict(images.active_images),
+        pagecache.active_cache,
+        compress.active_compressor,
+        search.active_index,
+        shared_cache.maxsize,
+        dict(conversions.BLOCK_HANDLERS),
+        list(conversions.BLOCK_DETECTORS),
+    )
+
+
+def init_worker(state):
+    fingerprints, image_attributes, cache, compressor, index, inline_cache_size, handlers, detectors = state
+    assets.active_fingerprints.clear()
+    assets.active_fingerprints.update(fingerprints)
+    images.active_images.clear()
+    images.active_images.update(image_attributes)
+    pagecache.active_cache = cache
+    compress.active_compressor = compressor
+    search.active_index = index
+    shared_cache.maxsize = inline_cache_size
+    conversions.BLOCK_HANDLERS.clear()
+    conversions.BLOCK_HANDLERS.update(handlers)
+    conversions.BLOCK_DETECTORS[:] = detectors
+
+
+def page_executor(jobs, mp_context=None):
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context, initializer=init_worker, initargs=(worker_state(),))
+
+
+def chunk_pages(pages, jobs):
+    # A few chunks per worker keeps every core busy when page sizes vary,
+    # without paying process round-trips for every single page.
+    size = max(1, min(64, len(pages) // (jobs * 4)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+def generate_chunk(chunk, template_path, basepath, profiling=False):
+    errors = []
+    profiles = []
+    pages_meta = {}
+    for from_path, dest_path in chunk:
+        profile = PageProfile(from_path) if profiling else None
+        try:
+            pages_meta[from_path] = generate_page(from_path, template_path, dest_path, basepath, profile)
+        except Exception as e:
+            errors.append((from_path, f"{type(e).__name__}: {e}"))
+            continue
+        if profile is not None:
+            profiles.append(profile)
+    compressed = compress.active_compressor.collect() if compress.active_compressor is not None else []
+    return errors, profiles, pages_meta, compressed
+
+
+def generate_pages_parallel(pages, template_path, basepath, jobs, manifest=None, profiler=None, site=None, mp_context=None):
+    fresh = set()
+    if manifest is not None:
+        fresh = {page for page in pages if manifest.is_fresh(*page)}
+    stale = [page for page in pages if page not in fresh]
+    errors = []
+    pages_meta = {}
+    if stale:
+        chunks = chunk_pages(stale, jobs)
+        with page_executor(jobs, mp_context) as executor:
+            futures = [
+                executor.submit(generate_chunk, chunk, template_path, basepath, profiler is not None)
+                for chunk in chunks
+            ]
+            # Results are gathered in submission order, not completion order, so
+            # the error report is the same no matter how the workers are scheduled.
+            for future in futures:
+                chunk_errors, profiles, chunk_meta, compressed = future.result()
+                errors.extend(chunk_errors)
+                pages_meta.update(chunk_meta)
+                if compressed:
+                    compress.active_compressor.record(compressed)
+                if profiler is not None:
+                    profiler.extend(profiles)
+
+    # Fresh and rendered pages reach the site index in page order, as in a
+    # serial build, so ids handed out in record order come out the same.
+    failed = {from_path for from_path, _ in errors}
+    for page in pages:
+        from_path, dest_path = page
+        if page in fresh:
+            if site is not None:
+                site.keep(from_path, dest_path)
+            continue
+        if from_path in failed:
+            continue
+        if manifest is not None:
+            manifest.record(from_path, dest_path, "page")
+        if site is not None:
+            site.record(from_path, dest_path, pages_meta[from_path])
+    if errors:
+        details = "\n".join(f"  {from_path}: {message}" for from_path, message in errors)
+        raise ValueError(f"{len(errors)} page(s) failed to build:\n{details}")
+    return stale
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import zlib
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_DIRECTORY_NAME = "search"
+# Terms are spread over the shards by crc32 of their UTF-8 bytes, which a
+# browser can compute for a query term to fetch the one shard it needs.
+TERM_SHARDS = 256
+PAGE_SHARD_SIZE = 1000
+TITLE_WEIGHT = 5
+MAX_TERM_LENGTH = 40
+# Pending postings are written out once a batch reaches this many, which
+# bounds memory on a full build of a large site.
+FLUSH_POSTINGS = 500000
+TERM_PATTERN = re.compile(r"\w\w+")
+# Meta key under which the renderer hands a page's term weights to the site
+# index. It is never stored with the page metadata.
+SEARCH_TERMS = "search_terms"
+
+# The search index of the running build. Renderers collect page text while
+# it is set.
+active_index = None
+
+
+def page_terms(title, texts):
+    weights = {}
+    for text in texts:
+        for term in TERM_PATTERN.findall(text.lower()):
+            if len(term) <= MAX_TERM_LENGTH:
+                weights[term] = weights.get(term, 0) + 1
+    for term in TERM_PATTERN.findall(title.lower()):
+        if len(term) <= MAX_TERM_LENGTH:
+            weights[term] = weights.get(term, 0) + TITLE_WEIGHT
+    return weights
+
+
+def term_shard(term):
+    return zlib.crc32(term.encode()) % TERM_SHARDS
+
+
+def read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class SearchIndex:
+    # Inverted index for client-side search, written to docs/search/:
+    # terms-XX.json maps every term of shard XX to a flat [page id, weight,
+    # ...] posting list, and pages-N.json maps page ids to [url, title] in
+    # blocks of PAGE_SHARD_SIZE ids, with urls under the site's basepath. .build keeps, per page, its id, the
+    # size and mtime it was indexed at, and a bitmask of the term shards it
+    # appears in, so a changed page only rewrites those shards and no page
+    # text is ever kept between builds.
+    def __init__(self, path, target_directory, basepath="/"):
+        self.path = path
+        self.basepath = basepath
+        self.directory = os.path.join(target_directory, SEARCH_DIRECTORY_NAME)
+        self.meta_path = os.path.join(self.directory, "index.json")
+        self.pages = {}
+        self.free_ids = []
+        self.next_id = 0
+        self.seen = set()
+        self.postings = {}
+        self.dropped = {}
+        self.page_changes = {}
+        self.pending = 0
+        # Bumped by every flush, and saved both here and with the shards, so
+        # a build that stopped between the two is noticed.
+        self.generation = 0
+        self.stale_shards = True
+        self.load()
+
+    def __getstate__(self):
+        # Worker processes only check that an index is active; postings not
+        # yet flushed stay with the build process.
+        state = dict(self.__dict__)
+        state.update(seen=set(), postings={}, dropped={}, page_changes={}, pending=0)
+        return state
+
+    def load(self):
+        data = read_json(self.path, {})
+        meta = read_json(self.meta_path, {})
+        # The shards in docs/ are the other half of the index; when they do
+        # not match, they are cleared and every page is indexed again.
+        if data.get("version") != SEARCH_INDEX_VERSION or meta != self.meta(data.get("generation"), len(data.get("pages", {}))):
+            return
+        self.pages = data["pages"]
+        self.free_ids = data["free_ids"]
+        self.next_id = data["next_id"]
+        self.generation = data["generation"]
+        self.stale_shards = False
+
+    def meta(self, generation, pages):
+        return {
+            "version": SEARCH_INDEX_VERSION,
+            "generation": generation,
+            "hash": "crc32",
+            "term_shards": TERM_SHARDS,
+            "page_shard_size": PAGE_SHARD_SIZE,
+            "basepath": self.basepath,
+            "pages": pages,
+        }
+
+    def save(self):
+        self.flush()
+        index_dir = os.path.dirname(self.path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        data = {
+            "version": SEARCH_INDEX_VERSION,
+            "generation": self.generation,
+            "pages": self.pages,
+            "free_ids": self.free_ids,
+            "next_id": self.next_id,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def is_current(self, source, url, title):
+        self.seen.add(source)
+        entry = self.pages.get(source)
+        if entry is None or entry["url"] != url or entry["title"] != title:
+            return False
+        stat = os.stat(source)
+        return entry["signature"] == [stat.st_size, stat.st_mtime_ns]
+
+    def drop_postings(self, entry):
+        mask = int(entry["shards"], 16)
+        for shard in range(TERM_SHARDS):
+            if mask >> shard & 1:
+                self.dropped.setdefault(shard, set()).add(entry["id"])
+
+    def add(self, source, url, title, terms):
+        self.seen.add(source)
+        entry = self.pages.get(source)
+        if entry is not None:
+            page_id = entry["id"]
+            self.drop_postings(entry)
+        elif self.free_ids:
+            page_id = self.free_ids.pop()
+        else:
+            page_id = self.next_id
+            self.next_id += 1
+        mask = 0
+        for term, weight in terms.items():
+            shard = term_shard(term)
+            mask |= 1 << shard
+            self.postings.setdefault(shard, {}).setdefault(term, []).extend((page_id, weight))
+        stat = os.stat(source)
+        self.pages[source] = {
+            "id": page_id,
+            "url": url,
+            "title": title,
+            "signature": [stat.st_size, stat.st_mtime_ns],
+            "shards": f"{mask:x}",
+        }
+        self.page_changes[page_id] = [self.basepath + url[1:], title]
+        self.pending += len(terms)
+        if self.pending >= FLUSH_POSTINGS:
+            self.flush()
+
+    def remove(self, source):
+        self.seen.discard(source)
+        entry = self.pages.pop(source, None)
+        if entry is None:
+            return
+        self.drop_postings(entry)
+        self.page_changes[entry["id"]] = None
+        self.free_ids.append(entry["id"])
+
+    def prune(self):
+        for source in [s for s in self.pages if s not in self.seen]:
+            self.remove(source)
+
+    def flush(self):
+        # Stale postings are dropped before new ones are added, so an id
+        # freed and reused within one batch ends up with the new page only.
+        if not (self.postings or self.dropped or self.page_changes or self.stale_shards):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self.stale_shards:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+            self.stale_shards = False
+        for shard in sorted(set(self.postings) | set(self.dropped)):
+            path = os.path.join(self.directory, f"terms-{shard:02x}.json")
+            terms = read_json(path, {})
+            dropped = self.dropped.get(shard)
+            if dropped:
+                for term, postings in list(terms.items()):
+                    kept = []
+                    for i in range(0, len(postings), 2):
+                        if postings[i] not in dropped:
+                            kept.extend(postings[i:i + 2])
+                    if kept:
+                        terms[term] = kept
+                    else:
+                        del terms[term]
+            for term, postings in self.postings.get(shard, {}).items():
+                terms.setdefault(term, []).extend(postings)
+            if terms:
+                write_json(path, terms)
+            elif os.path.exists(path):
+                os.remove(path)
+        blocks = {}
+        for page_id, page in self.page_changes.items():
+            blocks.setdefault(page_id // PAGE_SHARD_SIZE, {})[str(page_id)] = page
+        for block, changes in sorted(blocks.items()):
+            path = os.path.join(self.directory, f"pages-{block}.json")
+            pages = read_json(path, {})
+            for page_id, page in changes.items():
+                if page is None:
+                    pages.pop(page_id, None)
+                else:
+                    pages[page_id] = page
+            if pages:
+                write_json(path, pages)
+            elif os.path.exists(path):
+                os.remove(path)
+        self.generation += 1
+        write_json(self.meta_path, self.meta(self.generation, len(self.pages)))
+        self.postings = {}
+        self.dropped = {}
+        self.page_changes = {}
+        self.pending = 0
+
+
+def configure(path, target_directory, basepath="/"):
+    global active_index
+    active_index = SearchIndex(path, target_directory, basepath) if path is not None else None
+    return active_index
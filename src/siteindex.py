@@ -0,0 +1,267 @@
+import json
+import os
+import posixpath
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+import search
+from conversions import basepath_rewriter, extract_title, page_text_nodes
+from frontmatter import read_metadata, split_front_matter
+from htmlnode import LeafNode, ParentNode
+from manifest import remove_empty_dirs
+from template import load_template
+
+SITE_INDEX_VERSION = 1
+
+
+class SiteIndex:
+    # Title, URL, mtime and metadata of every page, collected while pages are
+    # generated and kept in .build/ so pages skipped as fresh keep their entry
+    # without being read again.
+    def __init__(self, path, target_directory):
+        self.path = path
+        self.target_directory = target_directory
+        self.pages = {}
+        self.artifacts = []
+        self.seen = set()
+        self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != SITE_INDEX_VERSION:
+            return
+        self.pages = data.get("pages", {})
+        self.artifacts = data.get("artifacts", [])
+
+    def save(self):
+        index_dir = os.path.dirname(self.path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        data = {"version": SITE_INDEX_VERSION, "pages": self.pages, "artifacts": self.artifacts}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def page_url(self, dest_path):
+        url = "/" + os.path.relpath(dest_path, self.target_directory).replace(os.sep, "/")
+        if url.endswith("/index.html"):
+            return url[:-len("index.html")]
+        return url
+
+    def record(self, source, dest_path, meta):
+        self.seen.add(source)
+        self.pages[source] = entry = {
+            "url": self.page_url(dest_path),
+            "title": meta["title"],
+            "mtime": os.stat(source).st_mtime_ns,
+            "meta": {key: value for key, value in meta.items() if key not in ("title", search.SEARCH_TERMS)},
+        }
+        self.index_page(source, entry, meta.get(search.SEARCH_TERMS))
+
+    def index_page(self, source, entry, terms=None):
+        # Pages whose source, URL and title are unchanged keep their postings
+        # even when they were rendered again.
+        index = search.active_index
+        if index is None or index.is_current(source, entry["url"], entry["title"]):
+            return
+        if terms is None:
+            with open(source, "r") as f:
+                text_nodes = page_text_nodes(split_front_matter(f.read())[1])
+            terms = search.page_terms(entry["title"], [node.text for node in text_nodes])
+        index.add(source, entry["url"], entry["title"], terms)
+
+    def keep(self, source, dest_path):
+        # Fresh pages are not rendered, so their entry comes from the saved
+        # index. Without one, the front matter is read on its own and the
+        # whole file only when it has no title.
+        self.seen.add(source)
+        entry = self.pages.get(source)
+        if entry is not None and entry["url"] == self.page_url(dest_path):
+            self.index_page(source, entry)
+            return
+        meta = read_metadata(source)
+        if "title" not in meta:
+            with open(source, "r") as f:
+                meta["title"] = extract_title(split_front_matter(f.read())[1])
+        self.record(source, dest_path, meta)
+
+    def remove(self, source):
+        self.seen.discard(source)
+        self.pages.pop(source, None)
+        if search.active_index is not None:
+            search.active_index.remove(source)
+
+    def prune(self):
+        for source in [s for s in self.pages if s not in self.seen]:
+            del self.pages[source]
+        if search.active_index is not None:
+            search.active_index.prune()
+
+    def outputs(self):
+        outputs = set()
+        for entry in self.pages.values():
+            name = entry["url"].lstrip("/")
+            outputs.add(name + "index.html" if entry["url"].endswith("/") else name)
+        return outputs
+
+    def entries(self):
+        return sorted(self.pages.values(), key=lambda entry: entry["url"])
+
+    def newest_first(self, entries):
+        return sorted(entries, key=lambda entry: (page_date(entry), entry["url"]), reverse=True)
+
+    def sections(self):
+        # Directories that hold pages but have no index page of their own.
+        urls = {entry["url"] for entry in self.pages.values()}
+        sections = {}
+        for entry in self.pages.values():
+            parent = posixpath.dirname(entry["url"].rstrip("/")).rstrip("/") + "/"
+            if parent != entry["url"] and parent not in urls:
+                sections.setdefault(parent, []).append(entry)
+        return sections
+
+    def tags(self):
+        tags = {}
+        for entry in self.pages.values():
+            tags_value = entry["meta"].get("tags", [])
+            for tag in [tags_value] if isinstance(tags_value, str) else tags_value:
+                tags.setdefault(tag, []).append(entry)
+        return tags
+
+
+def page_date(entry):
+    date = entry["meta"].get("date")
+    if date:
+        return str(date) if "T" in str(date) else f"{date}T00:00:00+00:00"
+    timestamp = datetime.fromtimestamp(entry["mtime"] / 1e9, timezone.utc)
+    return timestamp.isoformat(timespec="seconds")
+
+
+def tag_slug(tag):
+    return "-".join("".join(c if c.isalnum() else " " for c in tag.lower()).split())
+
+
+def sitemap_xml(site, site_url, rewrite_url=None):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for entry in site.entries():
+        url = rewrite_url(entry["url"]) if rewrite_url is not None else entry["url"]
+        lines.append(f"  <url><loc>{escape(site_url + url)}</loc><lastmod>{page_date(entry)[:10]}</lastmod></url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def atom_feed(site, site_url, title, section, rewrite_url=None, author=None):
+    # Atom requires an author; the feed's covers every entry that does not
+    # name its own in front matter.
+    rewrite = rewrite_url if rewrite_url is not None else (lambda url: url)
+    posts = site.newest_first(entry for entry in site.pages.values() if entry["url"].startswith(section) and entry["url"] != section)
+    feed_url = site_url + rewrite("/feed.xml")
+    updated = page_date(posts[0]) if posts else "1970-01-01T00:00:00+00:00"
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{escape(title)}</title>",
+        f"  <author><name>{escape(author or title)}</name></author>",
+        f"  <id>{escape(feed_url)}</id>",
+        f"  <link rel=\"self\" href={quoteattr(feed_url)}/>",
+        f"  <link href={quoteattr(site_url + rewrite('/'))}/>",
+        f"  <updated>{updated}</updated>",
+    ]
+    for entry in posts:
+        url = site_url + rewrite(entry["url"])
+        lines.append("  <entry>")
+        lines.append(f"    <title>{escape(entry['title'])}</title>")
+        if entry["meta"].get("author"):
+            lines.append(f"    <author><name>{escape(str(entry['meta']['author']))}</name></author>")
+        lines.append(f"    <id>{escape(url)}</id>")
+        lines.append(f"    <link href={quoteattr(url)}/>")
+        lines.append(f"    <updated>{page_date(entry)}</updated>")
+        if entry["meta"].get("description"):
+            lines.append(f"    <summary>{escape(str(entry['meta']['description']))}</summary>")
+        lines.append("  </entry>")
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def listing_html_node(title, entries):
+    # Built as nodes rather than markdown so titles are never re-read as
+    # inline markup.
+    items = [ParentNode("li", [LeafNode("a", entry["title"], {"href": entry["url"]})]) for entry in entries]
+    return ParentNode("div", [LeafNode("h1", title), ParentNode("ul", items)])
+
+
+class SiteArtifacts:
+    # Everything derived from the site index rather than from one page. Each
+    # artifact is regenerated in memory and written only when it differs
+    # from what is on disk, so an unchanged index rewrites nothing.
+    def __init__(self, site, template_path, basepath, site_url=None, listings=False, feed_section="/blog/", feed_title="Blog", feed_author=None):
+        self.site = site
+        self.template_path = template_path
+        self.basepath = basepath
+        self.site_url = site_url.rstrip("/") if site_url else None
+        self.listings = listings
+        self.feed_section = feed_section
+        self.feed_title = feed_title
+        self.feed_author = feed_author
+
+    def render_listing(self, title, entries, rewrite_url):
+        template = load_template(self.template_path)
+        return template.render({"Title": title, "Content": listing_html_node(title, entries)}, rewrite_url)
+
+    def build(self):
+        rewrite_url = basepath_rewriter(self.basepath)
+        artifacts = {}
+        if self.site_url is not None:
+            artifacts["sitemap.xml"] = sitemap_xml(self.site, self.site_url, rewrite_url)
+            artifacts["feed.xml"] = atom_feed(self.site, self.site_url, self.feed_title, self.feed_section, rewrite_url, self.feed_author)
+        if self.listings:
+            for url, entries in self.site.sections().items():
+                title = posixpath.basename(url.rstrip("/")).replace("-", " ").title() or "Pages"
+                artifacts[url.lstrip("/") + "index.html"] = self.render_listing(title, self.site.newest_first(entries), rewrite_url)
+            tags = self.site.tags()
+            for tag, entries in tags.items():
+                artifacts[f"tags/{tag_slug(tag)}/index.html"] = self.render_listing(f"Tagged {tag}", self.site.newest_first(entries), rewrite_url)
+            if tags:
+                index = [{"title": tag, "url": f"/tags/{tag_slug(tag)}/", "mtime": 0, "meta": {}} for tag in sorted(tags)]
+                artifacts["tags/index.html"] = self.render_listing("Tags", index, rewrite_url)
+        # A page always wins over a generated artifact at the same path, such
+        # as content/tags/index.md over the tag index.
+        outputs = self.site.outputs()
+        for name in sorted(set(artifacts) & outputs):
+            print(f"Skipping generated {name}: a page already builds it")
+            del artifacts[name]
+        return artifacts
+
+    def write(self):
+        target_directory = self.site.target_directory
+        artifacts = self.build()
+        written = []
+        for name, text in sorted(artifacts.items()):
+            path = os.path.join(target_directory, *name.split("/"))
+            try:
+                with open(path, "r") as f:
+                    if f.read() == text:
+                        continue
+            except OSError:
+                pass
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+            written.append(path)
+        # A stale artifact whose path now belongs to a real page (a listing
+        # replaced by an index.md) has already been overwritten by that page.
+        outputs = self.site.outputs()
+        for name in self.site.artifacts:
+            path = os.path.join(target_directory, *name.split("/"))
+            if name not in artifacts and name not in outputs and os.path.isfile(path):
+                os.remove(path)
+                remove_empty_dirs(os.path.dirname(path), target_directory)
+                written.append(path)
+        self.site.artifacts = sorted(artifacts)
+        return written
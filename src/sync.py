@@ -0,0 +1,125 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+
+# ioctl request number for FICLONE on Linux (share extents copy-on-write).
+FICLONE = 0x40049409
+
+
+class SyncResult:
+    __slots__ = ("copied", "linked", "skipped", "directories")
+
+    def __init__(self):
+        self.copied = 0
+        self.linked = 0
+        self.skipped = 0
+        self.directories = 0
+
+    def __repr__(self):
+        return f"SyncResult({self.copied} copied, {self.linked} linked, {self.skipped} unchanged, {self.directories} directories created)"
+
+    def summary(self):
+        return (
+            f"Static files: {self.copied} copied, {self.linked} linked, "
+            f"{self.skipped} unchanged, {self.directories} directories created"
+        )
+
+
+def scan_tree(source_directory, target_directory, files, result):
+    # DirEntry caches the file type from readdir and its stat() result, so each
+    # entry costs at most one stat call.
+    with os.scandir(source_directory) as entries:
+        for entry in entries:
+            dest_path = os.path.join(target_directory, entry.name)
+            if entry.is_dir():
+                if not os.path.isdir(dest_path):
+                    os.mkdir(dest_path)
+                    result.directories += 1
+                scan_tree(entry.path, dest_path, files, result)
+            elif entry.is_file():
+                files.append((entry.path, dest_path, entry.stat()))
+
+
+def is_synced(dest_path, stat):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if dest_stat.st_ino == stat.st_ino and dest_stat.st_dev == stat.st_dev:
+        return True
+    return dest_stat.st_size == stat.st_size and dest_stat.st_mtime_ns == stat.st_mtime_ns
+
+
+def reflink(from_path, dest_path):
+    import fcntl
+
+    with open(from_path, "rb") as src, open(dest_path, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(from_path, dest_path)
+
+
+def sync_file(from_path, dest_path, mode="copy"):
+    # Links and clones are made under a temporary name and renamed over the
+    # destination, so readers never see a half-written file.
+    if mode == "hardlink":
+        tmp_path = f"{dest_path}.tmp-link"
+        try:
+            os.link(from_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return "linked"
+        except OSError:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+    elif mode == "reflink":
+        tmp_path = f"{dest_path}.tmp-clone"
+        try:
+            reflink(from_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return "linked"
+        except (OSError, ImportError):
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+    if os.path.islink(dest_path) or (os.path.exists(dest_path) and os.stat(dest_path).st_nlink > 1):
+        # Never write through a hard link into the source tree.
+        os.remove(dest_path)
+    shutil.copy2(from_path, dest_path)
+    return "copied"
+
+
+def sync_tree(source_directory, target_directory, jobs=8, mode="copy", manifest=None):
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{mode}'")
+    result = SyncResult()
+    files = []
+    os.makedirs(target_directory, exist_ok=True)
+    scan_tree(source_directory, target_directory, files, result)
+
+    def sync_entry(from_path, dest_path, stat, copy):
+        action = sync_file(from_path, dest_path, mode) if copy else None
+        if manifest is not None:
+            manifest.digest(from_path, stat)
+        return action
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = []
+        for from_path, dest_path, stat in files:
+            copy = not is_synced(dest_path, stat)
+            if not copy:
+                result.skipped += 1
+                if manifest is None or not manifest.needs_record(from_path, dest_path, stat):
+                    if manifest is not None:
+                        manifest.seen.add(from_path)
+                    continue
+            futures.append((from_path, dest_path, executor.submit(sync_entry, from_path, dest_path, stat, copy)))
+
+        for from_path, dest_path, future in futures:
+            action = future.result()
+            if action == "copied":
+                result.copied += 1
+            elif action == "linked":
+                result.linked += 1
+            if manifest is not None:
+                manifest.record(from_path, dest_path, "static")
+    return result
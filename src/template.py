@@ -0,0 +1,81 @@
+import os
+import re
+from htmlnode import HTMLNode, escape_text
+
+LITERAL = "literal"
+VARIABLE = "variable"
+URL = "url"
+
+TEMPLATE_TOKEN_PATTERN = re.compile(
+    r"\{\{\s*(?P<name>\w+)\s*\}\}|(?P<attr>\b(?:href|src)=\")(?P<url>[^\"]*)\""
+)
+
+_template_cache = {}
+
+
+class TrustedHTML(str):
+    # A variable that already is markup, such as a rendered page body, and is
+    # written as is. Every other string variable is escaped as text.
+    __slots__ = ()
+
+
+class Template:
+    def __init__(self, text):
+        self.text = text
+        self.segments = parse_template(text)
+
+    def iter_render(self, variables, rewrite_url=None):
+        for kind, value in self.segments:
+            if kind == LITERAL:
+                yield value
+            elif kind == URL:
+                yield rewrite_url(value) if rewrite_url is not None else value
+            elif value not in variables:
+                yield f"{{{{ {value} }}}}"
+            elif isinstance(variables[value], HTMLNode):
+                yield from variables[value].iter_html(rewrite_url)
+            elif isinstance(variables[value], TrustedHTML):
+                yield variables[value]
+            else:
+                yield escape_text(str(variables[value]))
+
+    def render(self, variables, rewrite_url=None):
+        return "".join(self.iter_render(variables, rewrite_url))
+
+    def write(self, fp, variables, rewrite_url=None):
+        for fragment in self.iter_render(variables, rewrite_url):
+            fp.write(fragment)
+
+
+def parse_template(text):
+    # Placeholders and the URLs of href/src attributes become their own
+    # segments; everything in between is kept as literal text.
+    segments = []
+    position = 0
+    for match in TEMPLATE_TOKEN_PATTERN.finditer(text):
+        if match.group("name") is not None:
+            literal = text[position:match.start()]
+            token = (VARIABLE, match.group("name"))
+            position = match.end()
+        else:
+            literal = text[position:match.end("attr")]
+            token = (URL, match.group("url"))
+            position = match.end("url")
+        if literal:
+            segments.append((LITERAL, literal))
+        segments.append(token)
+    if position < len(text):
+        segments.append((LITERAL, text[position:]))
+    return segments
+
+
+def load_template(template_path):
+    stat = os.stat(template_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(template_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(template_path, "r") as f:
+        template = Template(f.read())
+    _template_cache[template_path] = (key, template)
+    return template
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import assets
+from assets import AssetPipeline, fingerprint_path, remove_fingerprints
+from conversions import generate_page
+from manifest import BuildManifest
+
+
+class TestAssetPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "me.png"), "png")
+        self.manifest = BuildManifest(os.path.join(root, ".build", "manifest.json"))
+        self.pipeline = AssetPipeline(self.static, self.docs, self.manifest)
+
+    def tearDown(self):
+        assets.active_fingerprints.clear()
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_fingerprint_path(self):
+        self.assertEqual(fingerprint_path(os.path.join("css", "index.css"), "3f9a2c8b00"), os.path.join("css", "index.3f9a2c8b.css"))
+        self.assertEqual(fingerprint_path("LICENSE", "3f9a2c8b00"), "LICENSE.3f9a2c8b")
+
+    def test_run_writes_copies_and_manifest(self):
+        self.assertEqual(len(self.pipeline.run()), 2)
+        css = self.pipeline.fingerprints["/index.css"]
+        self.assertRegex(css, r"^/index\.[0-9a-f]{8}\.css$")
+        with open(os.path.join(self.docs, css[1:])) as f:
+            self.assertEqual(f.read(), "body {}")
+        with open(os.path.join(self.docs, "assets.json")) as f:
+            self.assertEqual(json.load(f), self.pipeline.fingerprints)
+        self.assertEqual(AssetPipeline(self.static, self.docs, self.manifest).run(), [])
+
+    def test_changed_asset_replaces_its_copy(self):
+        self.pipeline.run()
+        old = os.path.join(self.docs, self.pipeline.fingerprints["/index.css"][1:])
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        os.utime(os.path.join(self.static, "index.css"), ns=(10, 10))
+        self.assertEqual(self.pipeline.run(), [os.path.join(self.static, "index.css")])
+        self.assertFalse(os.path.exists(old))
+
+    def test_build_without_fingerprints_removes_copies(self):
+        self.pipeline.run()
+        css = os.path.join(self.docs, self.pipeline.fingerprints["/index.css"][1:])
+        self.write(f"{css}.gz", "gz")
+        self.write(os.path.join(self.docs, "assets.json.gz"), "gz")
+        self.assertEqual(
+            remove_fingerprints(self.static, self.docs),
+            [os.path.join(self.static, "images", "me.png"), os.path.join(self.static, "index.css")],
+        )
+        self.assertEqual(os.listdir(self.docs), [])
+        self.assertEqual(assets.active_fingerprints, {})
+        self.assertEqual(remove_fingerprints(self.static, self.docs), [])
+
+    def test_pages_and_template_use_fingerprinted_urls(self):
+        self.pipeline.run()
+        template = os.path.join(self.tmp.name, "template.html")
+        source = os.path.join(self.tmp.name, "index.md")
+        self.write(template, '<link href="/index.css">{{ Content }}')
+        self.write(source, "# Home\n\n![me](/images/me.png) [out](https://example.com/index.css)")
+        dest = os.path.join(self.docs, "index.html")
+        with redirect_stdout(StringIO()):
+            generate_page(source, template, dest, "/base/")
+        with open(dest) as f:
+            page = f.read()
+        self.assertIn(f'href="/base{self.pipeline.fingerprints["/index.css"]}"', page)
+        self.assertIn(f'src="/base{self.pipeline.fingerprints["/images/me.png"]}"', page)
+        self.assertIn('href="https://example.com/index.css"', page)
+        self.assertEqual(self.pipeline.template_fingerprints(template), {"/index.css": self.pipeline.fingerprints["/index.css"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from blocks import Block, classify_lines, scan_blocks
+from blocktype import BlockType
+
+
+class TestScanBlocks(unittest.TestCase):
+    def test_scan_blocks(self):
+        md = """
+# Title
+
+Some **bold**
+text here
+
+- one
+- two
+
+1. first
+2. second
+"""
+        self.assertListEqual(
+            [
+                Block(BlockType.HEADING, 1, 2, ["# Title"]),
+                Block(BlockType.PARAGRAPH, 3, 5, ["Some **bold**", "text here"]),
+                Block(BlockType.UNORDERED_LIST, 6, 8, ["- one", "- two"]),
+                Block(BlockType.ORDERED_LIST, 9, 11, ["1. first", "2. second"]),
+            ],
+            list(scan_blocks(md)),
+        )
+
+    def test_code_fence_keeps_blank_lines(self):
+        md = "Intro\n\n```\nfirst\n\n\nsecond\n```\n\nAfter"
+        blocks = list(scan_blocks(md))
+        self.assertEqual([block.block_type for block in blocks], [BlockType.PARAGRAPH, BlockType.CODE, BlockType.PARAGRAPH])
+        self.assertEqual(blocks[1].text, "```\nfirst\n\n\nsecond\n```")
+        self.assertEqual((blocks[1].start, blocks[1].end), (2, 8))
+        self.assertEqual(blocks[2].start, 9)
+
+    def test_unclosed_fence_is_paragraph(self):
+        blocks = list(scan_blocks("```\nnever closed\n\nnext"))
+        self.assertEqual([block.block_type for block in blocks], [BlockType.PARAGRAPH, BlockType.PARAGRAPH])
+
+    def test_only_a_fence_line_opens_a_fence(self):
+        blocks = list(scan_blocks("```x``` is cool\n\npara\n\n```py\ncode\n```\n\n```one```"))
+        self.assertEqual([block.block_type for block in blocks], [BlockType.PARAGRAPH, BlockType.PARAGRAPH, BlockType.CODE, BlockType.CODE])
+        self.assertEqual(blocks[2].lines, ["```py", "code", "```"])
+
+    def test_whitespace_only_lines_separate_blocks(self):
+        blocks = list(scan_blocks("  first  \n   \n\t\nsecond\n\n\n"))
+        self.assertEqual([block.lines for block in blocks], [["first"], ["second"]])
+
+    def test_classify_lines(self):
+        self.assertEqual(classify_lines(["> a", ">", "> b"]), BlockType.QUOTE)
+        self.assertEqual(classify_lines(["- a", "not a list"]), BlockType.PARAGRAPH)
+        self.assertEqual(classify_lines(["1. a", "3. b"]), BlockType.PARAGRAPH)
+        self.assertEqual(classify_lines(["###### deep"]), BlockType.HEADING)
+        self.assertEqual(classify_lines(["####### too deep"]), BlockType.PARAGRAPH)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from buildprofile import STAGES, BuildProfiler, PageProfile
+from conversions import generate_page
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        self.source = os.path.join(self.root, "index.md")
+        with open(self.template, "w") as f:
+            f.write('<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        with open(self.source, "w") as f:
+            f.write("# Home\n\nSome **bold** [link](/about)\n\n- a\n- b")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, dest_name, profile=None):
+        dest_path = os.path.join(self.root, dest_name)
+        with redirect_stdout(StringIO()):
+            generate_page(self.source, self.template, dest_path, "/base/", profile)
+        with open(dest_path) as f:
+            return f.read()
+
+    def test_profiled_page_records_every_stage(self):
+        profile = PageProfile(self.source)
+        self.generate("profiled.html", profile)
+        self.assertEqual(set(profile.stages), set(STAGES))
+        self.assertEqual(profile.stages["read"][1], os.path.getsize(self.source))
+        self.assertGreater(profile.total(), 0)
+
+    def test_profiled_output_matches_streamed_output(self):
+        self.assertEqual(self.generate("plain.html"), self.generate("profiled.html", PageProfile(self.source)))
+
+    def test_summary_and_trace(self):
+        profiler = BuildProfiler()
+        slow = profiler.page("slow.md")
+        slow.add("inline_parse", 0.5, 100)
+        fast = profiler.page("fast.md")
+        fast.add("read", 0.1, 10)
+        summary = profiler.summary(top=1)
+        self.assertIn("Slowest 1 page(s)", summary)
+        self.assertIn("slow.md  (mostly inline_parse)", summary)
+        self.assertNotIn("fast.md", summary)
+
+        trace_path = os.path.join(self.root, "trace", "profile.json")
+        profiler.write_trace(trace_path)
+        with open(trace_path) as f:
+            trace = json.load(f)
+        self.assertEqual(trace["stages"]["inline_parse"], {"seconds": 0.5, "bytes": 100})
+        self.assertEqual([page["page"] for page in trace["pages"]], ["slow.md", "fast.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
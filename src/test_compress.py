@@ -0,0 +1,106 @@
+import gzip
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import compress
+from compress import MIN_COMPRESS_BYTES, Compressor, gzip_bytes
+from conversions import generate_page
+
+TEXT = "<p>" + "the quick brown fox " * 40 + "</p>"
+
+
+class TestCompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.index_path = os.path.join(self.tmp.name, ".build", "compress.json")
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.compressor = Compressor(self.docs, self.index_path, jobs=2)
+
+    def tearDown(self):
+        self.compressor.close()
+        compress.configure(None)
+        self.tmp.cleanup()
+
+    def write(self, relative, text):
+        path = os.path.join(self.docs, *relative.split("/"))
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def read_gz(self, path):
+        with gzip.open(f"{path}.gz", "rt") as f:
+            return f.read()
+
+    def test_gzip_is_deterministic(self):
+        data = TEXT.encode()
+        self.assertEqual(gzip_bytes(data), gzip_bytes(data))
+        self.assertEqual(gzip.decompress(gzip_bytes(data)), data)
+
+    def test_submitted_pages_are_compressed(self):
+        path = self.write("blog/index.html", TEXT)
+        self.compressor.submit(path, TEXT.encode())
+        self.compressor.wait()
+        self.assertEqual(self.read_gz(path), TEXT)
+        self.assertEqual(self.compressor.index["blog/index.html"]["size"], len(TEXT))
+        # The same bytes written again keep their .gz.
+        os.utime(f"{path}.gz", ns=(1, 1))
+        self.compressor.submit(path, TEXT.encode())
+        self.compressor.wait()
+        self.assertEqual(os.stat(f"{path}.gz").st_mtime_ns, 1)
+        self.assertEqual((self.compressor.compressed, self.compressor.unchanged), (1, 1))
+
+    def test_sweep_compresses_changed_outputs_only(self):
+        css = self.write("index.css", "body { color: red } " * 30)
+        self.write("tiny.css", "a {}")
+        self.write("photo.png", "x" * MIN_COMPRESS_BYTES)
+        self.compressor.sweep()
+        self.assertTrue(os.path.exists(f"{css}.gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tiny.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "photo.png.gz")))
+        self.compressor.save()
+
+        compressor = Compressor(self.docs, self.index_path)
+        try:
+            compressor.sweep()
+            self.assertEqual((compressor.compressed, compressor.unchanged), (0, 1))
+            self.write("index.css", "body { color: blue } " * 30)
+            os.utime(css, ns=(10, 10))
+            compressor.sweep()
+            self.assertEqual(compressor.compressed, 1)
+            self.assertEqual(self.read_gz(css), "body { color: blue } " * 30)
+        finally:
+            compressor.close()
+
+    def test_sweep_removes_gz_of_removed_outputs(self):
+        path = self.write("blog/index.html", TEXT)
+        self.write("archive.tar.gz", "not ours")
+        self.compressor.sweep()
+        os.remove(path)
+        self.compressor.sweep()
+        self.assertFalse(os.path.exists(f"{path}.gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "archive.tar.gz")))
+        self.assertEqual(self.compressor.index, {})
+
+    def test_generate_page_hands_its_bytes_over(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        source = os.path.join(self.tmp.name, "index.md")
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        with open(source, "w") as f:
+            f.write("# Home\n\n" + "Some words here. " * 30)
+        dest = os.path.join(self.docs, "index.html")
+        compressor = compress.configure(self.docs, self.index_path)
+        with redirect_stdout(StringIO()):
+            generate_page(source, template, dest, "/")
+        compressor.wait()
+        with open(dest) as f:
+            self.assertEqual(self.read_gz(dest), f.read())
+        self.assertIn("index.html", compressor.index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,10 @@
+import os
+import tempfile
 import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import pagecache
+from buildprofile import PageProfile
 from conversions import *
 from blocktype import BlockType
 from textnode import TextNode, TextType
@@ -165,6 +171,46 @@ This is the same paragraph on a new line
             )
 
 
+    def test_text_to_textnodes_matches_split_passes(self):
+        text = "A [link](/a) then **bold** and ![img](/i.png) and `code` and _it_ and [b](/b)"
+        nodes = [TextNode(text, TextType.TEXT)]
+        nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+        nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+        nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+        nodes = split_nodes_image(nodes)
+        nodes = split_nodes_link(nodes)
+        self.assertListEqual(nodes, text_to_textnodes(text))
+
+    def test_text_to_textnodes_many_links(self):
+        text = " ".join(f"[l{i}](/p/{i})" for i in range(500))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 999)
+        self.assertEqual(nodes[-1], TextNode("l499", TextType.LINK, "/p/499"))
+
+    def test_text_to_textnodes_underscore_in_url(self):
+        nodes = text_to_textnodes("see [docs](https://a.com/some_long_path)")
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("docs", TextType.LINK, "https://a.com/some_long_path"),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_unmatched_brackets_are_text(self):
+        nodes = text_to_textnodes("[not a link] and ![nor] this [x](y)")
+        self.assertListEqual(
+            [
+                TextNode("[not a link] and ![nor] this ", TextType.TEXT),
+                TextNode("x", TextType.LINK, "y"),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_unmatched_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("This is not **correct")
+
     def test_block_to_block_types(self):
         # Test a heading
         block = "# This is a Heading"
@@ -223,6 +269,64 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_codeblock_with_blank_lines(self):
+        md = """
+```
+first line
+
+second line
+```
+"""
+
+        node = markdown_to_html_node(md)
+        html = node.to_html()
+        self.assertEqual(
+            html,
+            "<div><pre><code>first line\n\nsecond line\n</code></pre></div>",
+        )
+
+    def test_repeated_blocks_are_kept(self):
+        md = "Same paragraph\n\n---\n\nSame paragraph\n\n---"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(
+            html,
+            "<div><p>Same paragraph</p><p>---</p><p>Same paragraph</p><p>---</p></div>",
+        )
+
+    def test_iter_html_nodes(self):
+        nodes = iter_html_nodes("# Title\n\n- a\n- b")
+        self.assertEqual(next(nodes).to_html(), "<h1>Title</h1>")
+        self.assertEqual(next(nodes).to_html(), "<ul><li>a</li><li>b</li></ul>")
+        with self.assertRaises(StopIteration):
+            next(nodes)
+
+    def test_register_block_handler(self):
+        def rule_handler(block, render_inline):
+            return LeafNode("hr", "")
+
+        def note_handler(block, render_inline):
+            return ParentNode("aside", render_inline(block.text[len("NOTE: "):]))
+
+        saved_handlers = dict(BLOCK_HANDLERS)
+        saved_detectors = list(BLOCK_DETECTORS)
+        try:
+            register_block_handler("rule", rule_handler, lambda block: block.lines == ["---"])
+            register_block_handler("note", note_handler, lambda block: block.text.startswith("NOTE: "))
+            html = markdown_to_html_node("Intro\n\n---\n\nNOTE: be **careful**").to_html()
+        finally:
+            BLOCK_HANDLERS.clear()
+            BLOCK_HANDLERS.update(saved_handlers)
+            BLOCK_DETECTORS[:] = saved_detectors
+        self.assertEqual(html, "<div><p>Intro</p><hr></hr><aside>be <b>careful</b></aside></div>")
+
+    def test_missing_block_handler(self):
+        saved_handler = BLOCK_HANDLERS.pop(BlockType.QUOTE)
+        try:
+            with self.assertRaises(ValueError):
+                markdown_to_html_node("> quoted")
+        finally:
+            BLOCK_HANDLERS[BlockType.QUOTE] = saved_handler
+
     def test_extract_title(self):
         md = """
 # Hello World!
@@ -253,3 +357,54 @@ properly
 """
         title = extract_title(md)
         self.assertEqual(title, "Hello World!")
+
+    def test_failed_page_keeps_previous_output(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "page.md")
+            template = os.path.join(root, "template.html")
+            dest = os.path.join(root, "docs", "page.html")
+            os.makedirs(os.path.dirname(dest))
+            with open(source, "w") as f:
+                f.write("# Title\n\nfine\n\n****")
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            with open(dest, "w") as f:
+                f.write("previous")
+            with redirect_stdout(StringIO()), self.assertRaises(ValueError):
+                generate_page(source, template, dest, "/")
+            with open(dest) as f:
+                self.assertEqual(f.read(), "previous")
+            self.assertEqual(os.listdir(os.path.dirname(dest)), ["page.html"])
+
+    def test_whitespace_only_line_separates_paragraphs(self):
+        node = markdown_to_html_node("first\n \t\nsecond")
+        self.assertEqual(node.to_html(), "<div><p>first</p><p>second</p></div>")
+
+    def test_title_is_escaped_in_the_template(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "page.md")
+            template = os.path.join(root, "template.html")
+            dest = os.path.join(root, "page.html")
+            with open(source, "w") as f:
+                f.write("# A & <B>\n\ntext")
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            outputs = []
+            for cache_directory, profile in ((None, None), (os.path.join(root, "cache"), None), (None, PageProfile(source))):
+                pagecache.configure(cache_directory)
+                with redirect_stdout(StringIO()):
+                    generate_page(source, template, dest, "/", profile)
+                with open(dest) as f:
+                    outputs.append(f.read())
+            pagecache.configure(None)
+        self.assertEqual(outputs, ["<title>A &amp; &lt;B&gt;</title><div><h1>A &amp; &lt;B&gt;</h1><p>text</p></div>"] * 3)
+
+    def test_inline_code_opening_a_paragraph_is_not_a_fence(self):
+        node = markdown_to_html_node("```x``` is cool\n\npara\n\n```\ncode\n```")
+        self.assertEqual(node.to_html(), "<div><p><code>x</code> is cool</p><p>para</p><pre><code>code\n</code></pre></div>")
+
+    def test_page_text_nodes_match_rendered_text_nodes(self):
+        md = "# The **Hobbit**\n\nA [link](/a) and ![img](/i.png)\n\n> _quote_\n\n- `one`\n- two\n\n1. first\n\n```\ncode\n```"
+        rendered = []
+        markdown_to_html_node(md, text_nodes=rendered)
+        self.assertEqual(page_text_nodes(md), rendered)
@@ -0,0 +1,87 @@
+import http.client
+import json
+import unittest
+from conversions import markdown_to_html_node
+from daemon import LatencyStats, RenderDaemon, render_many, start_render_server
+import daemon
+
+
+class TestRenderMany(unittest.TestCase):
+    def test_results_match_single_renders(self):
+        documents = ["# One\n\nA [link](/a)", "---\ntitle: Two\n---\n- **b**", "plain"]
+        results = render_many(documents)
+        self.assertEqual(
+            results,
+            [
+                ("<div><h1>One</h1><p>A <a href=\"/a\">link</a></p></div>", None),
+                (markdown_to_html_node("- **b**").to_html(), None),
+                ("<div><p>plain</p></div>", None),
+            ],
+        )
+        self.assertEqual(render_many(["[x](/x)"], "/base/"), [("<div><p><a href=\"/base/x\">x</a></p></div>", None)])
+
+    def test_errors_stay_with_their_document(self):
+        results = render_many(["ok", "an **unclosed bold", "fine"])
+        self.assertEqual(results[0], ("<div><p>ok</p></div>", None))
+        self.assertIsNone(results[1][0])
+        self.assertTrue(results[1][1].startswith("ValueError: "))
+        self.assertEqual(results[2], ("<div><p>fine</p></div>", None))
+
+    def test_large_batches_fan_out(self):
+        saved = daemon.FAN_OUT_BYTES
+        daemon.FAN_OUT_BYTES = 0
+        renderer = RenderDaemon(jobs=2).start()
+        try:
+            documents = [f"# Page {i}\n\n_{i}_" for i in range(20)]
+            self.assertEqual(renderer.render(documents), render_many(documents))
+        finally:
+            renderer.close()
+            daemon.FAN_OUT_BYTES = saved
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_percentiles(self):
+        stats = LatencyStats()
+        self.assertEqual(stats.percentiles(), {"p50": 0.0, "p90": 0.0, "p99": 0.0})
+        for ms in range(1, 101):
+            stats.record(ms / 1000, 2)
+        self.assertEqual(stats.percentiles(), {"p50": 50.0, "p90": 90.0, "p99": 99.0})
+        self.assertEqual((stats.requests, stats.documents), (100, 200))
+        self.assertTrue(stats.summary().startswith("Render daemon: 100 request(s), 200 document(s), p50 50.000 ms"))
+
+
+class TestRenderServer(unittest.TestCase):
+    def setUp(self):
+        self.renderer = RenderDaemon()
+        self.server = start_render_server(self.renderer, 0)
+        self.connection = http.client.HTTPConnection("localhost", self.server.server_address[1])
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.renderer.close()
+
+    def request(self, method, path, body=None):
+        self.connection.request(method, path, body)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_render_and_stats(self):
+        body = json.dumps({"documents": ["# Hi", "an **unclosed"], "basepath": "/base/"})
+        status, data = self.request("POST", "/render", body)
+        self.assertEqual(status, 200)
+        self.assertEqual(data["results"][0], {"html": "<div><h1>Hi</h1></div>"})
+        self.assertIn("error", data["results"][1])
+        # The same connection is kept alive for the next request.
+        status, stats = self.request("GET", "/stats")
+        self.assertEqual((status, stats["requests"], stats["documents"]), (200, 1, 2))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.request("POST", "/render", "not json")[0], 400)
+        self.assertEqual(self.request("POST", "/render", json.dumps({"documents": [1]}))[0], 400)
+        self.assertEqual(self.request("POST", "/other", "{}")[0], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
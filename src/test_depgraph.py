@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import conversions
+from conversions import copy_files_recursion, generate_pages_recursion
+from depgraph import DependencyIndex, page_references
+from htmlnode import ParentNode
+from manifest import BuildManifest
+from watch import SiteWatcher
+
+
+class TestDependencyIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.index_path = os.path.join(root, ".build", "depgraph.json")
+        for directory in (os.path.join(self.content, "blog", "post"), os.path.join(self.static, "images"), self.docs):
+            os.makedirs(directory)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n- [Post](/blog/post)\n- [Missing](/nope)")
+        self.write(
+            os.path.join(self.content, "blog", "post", "index.md"),
+            "# Post\n\n![me](/images/me.png) [home](../../) [site](https://example.com)\n\n```\n[not](/a/link)\n```",
+        )
+        self.write(os.path.join(self.static, "images", "me.png"), "png")
+        self.index = DependencyIndex(self.content, self.static, self.index_path)
+        self.index.scan()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text, mtime=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+
+    def test_page_references(self):
+        self.assertEqual(
+            page_references("# [Top](/top)\n\n> see ![x](/x.png)\n\n1. [a](/a)\n2. [a](/a)"),
+            ["/top", "/x.png", "/a"],
+        )
+
+    def test_built_in_blocks_are_only_tokenized(self):
+        def fail(block, render_inline=None):
+            raise AssertionError("built an HTML node")
+
+        markdown = "# [Top](/top)\n\nsee [a](/a)\n\n```\n[not](/code)\n```"
+        saved = conversions.block_to_html_node
+        conversions.block_to_html_node = fail
+        try:
+            self.assertEqual(page_references(markdown), ["/top", "/a"])
+        finally:
+            conversions.block_to_html_node = saved
+
+    def test_references_follow_registered_handlers(self):
+        saved_handlers = dict(conversions.BLOCK_HANDLERS)
+        saved_detectors = list(conversions.BLOCK_DETECTORS)
+        try:
+            conversions.register_block_handler(
+                "note",
+                lambda block, render_inline: ParentNode("aside", render_inline(block.text[len("NOTE: "):])),
+                lambda block: block.text.startswith("NOTE: "),
+            )
+            self.assertEqual(page_references("# Title\n\nNOTE: see [post](/blog/post)"), ["/blog/post"])
+        finally:
+            conversions.BLOCK_HANDLERS.clear()
+            conversions.BLOCK_HANDLERS.update(saved_handlers)
+            conversions.BLOCK_DETECTORS[:] = saved_detectors
+
+    def test_dependencies_and_dependents(self):
+        home = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        image = os.path.join(self.static, "images", "me.png")
+        self.assertEqual(self.index.dependencies(post), {image, home})
+        self.assertEqual(self.index.dependencies(home), {post})
+        self.assertEqual(self.index.dependents([image]), {post})
+        self.assertEqual(self.index.dependents([post]), {home})
+
+    def test_broken_links(self):
+        self.assertEqual(self.index.broken_links(), [(os.path.join(self.content, "index.md"), "/nope")])
+        nope = os.path.join(self.content, "nope.md")
+        self.write(nope, "# Nope")
+        self.assertEqual(self.index.dependents(self.index.scan()), {os.path.join(self.content, "index.md")})
+        self.assertEqual(self.index.broken_links(), [])
+
+    def test_saved_index_skips_unchanged_pages(self):
+        self.index.save()
+        loaded = DependencyIndex(self.content, self.static, self.index_path)
+        self.assertEqual(loaded.scan(), [])
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        os.remove(post)
+        self.assertEqual(loaded.scan(), [post])
+
+    def test_watcher_rebuilds_dependents(self):
+        manifest = BuildManifest(os.path.join(self.tmp.name, ".build", "manifest.json"))
+        with redirect_stdout(StringIO()):
+            manifest.begin(self.template, "/")
+            copy_files_recursion(self.static, self.docs, manifest)
+            generate_pages_recursion(self.content, self.template, self.docs, "/", manifest)
+        watcher = SiteWatcher(self.content, self.static, self.template, self.docs, "/", manifest, self.index)
+        self.write(os.path.join(self.static, "images", "me.png"), "new png", 10)
+        with redirect_stdout(StringIO()):
+            rebuilt = watcher.poll()
+        self.assertEqual(
+            sorted(rebuilt),
+            [os.path.join(self.docs, "blog", "post", "index.html"), os.path.join(self.docs, "images", "me.png")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import pickle
+import unittest
+from blocktype import BlockType
+from conversions import BLOCK_DETECTORS, BLOCK_HANDLERS, markdown_to_html_node, register_block_handler
+from docir import IR_MAGIC, RAW_BLOCK, Document, markdown_to_document
+from htmlnode import ParentNode
+
+MARKDOWN = """# The **Hobbit**
+
+A paragraph with _italic_, `code` and a [link](/blog) and ![an image](/i.png).
+
+> a quote
+> over lines
+
+- one
+- [two](/two)
+
+1. first
+2. second
+
+```
+def f():
+    return 1
+```
+"""
+
+
+class TestDocumentIR(unittest.TestCase):
+    def test_html_matches_direct_render(self):
+        document = markdown_to_document(MARKDOWN)
+        self.assertEqual(document.to_html_node().to_html(), markdown_to_html_node(MARKDOWN).to_html())
+
+    def test_detected_blocks_render_through_their_handler(self):
+        def note_handler(block, render_inline):
+            return ParentNode("aside", render_inline(block.text[len("NOTE: "):]))
+
+        saved_handlers = dict(BLOCK_HANDLERS)
+        saved_detectors = list(BLOCK_DETECTORS)
+        try:
+            register_block_handler("note", note_handler, lambda block: block.text.startswith("NOTE: "))
+            document = Document.from_bytes(markdown_to_document("Intro\n\nNOTE: be **careful**").to_bytes())
+            html = document.to_html_node().to_html()
+        finally:
+            BLOCK_HANDLERS.clear()
+            BLOCK_HANDLERS.update(saved_handlers)
+            BLOCK_DETECTORS[:] = saved_detectors
+        self.assertIn(RAW_BLOCK, document.kinds)
+        self.assertEqual(html, "<div><p>Intro</p><aside>be <b>careful</b></aside></div>")
+
+    def test_overridden_handlers_are_followed(self):
+        def shouting_paragraph(block, render_inline):
+            return ParentNode("p", render_inline(" ".join(block.lines).upper()))
+
+        def sectioned_paragraph(block, render_inline):
+            return ParentNode("section", render_inline(" ".join(block.lines)))
+
+        saved_handlers = dict(BLOCK_HANDLERS)
+        try:
+            register_block_handler(BlockType.PARAGRAPH, shouting_paragraph)
+            document = markdown_to_document("# Title\n\nquiet [words](/w)")
+            self.assertEqual(list(document.kinds).count(RAW_BLOCK), 1)
+            self.assertEqual(document.to_html_node().to_html(), "<div><h1>Title</h1><p>QUIET <a href=\"/W\">WORDS</a></p></div>")
+            register_block_handler(BlockType.PARAGRAPH, sectioned_paragraph)
+            document = markdown_to_document("# Title\n\nquiet [words](/w)")
+            self.assertEqual(list(document.kinds).count(RAW_BLOCK), 1)
+            self.assertEqual(document.strings[-1], "quiet [words](/w)")
+            self.assertEqual(document.to_html_node().to_html(), markdown_to_html_node("# Title\n\nquiet [words](/w)").to_html())
+        finally:
+            BLOCK_HANDLERS.clear()
+            BLOCK_HANDLERS.update(saved_handlers)
+
+    def test_strings_are_shared(self):
+        document = markdown_to_document("- [a](/a)\n- [a](/a)")
+        self.assertEqual(len(document), 6)
+        self.assertEqual(document.strings, ["a", "/a"])
+
+    def test_binary_round_trip(self):
+        document = markdown_to_document(MARKDOWN)
+        data = document.to_bytes()
+        self.assertTrue(data.startswith(IR_MAGIC))
+        self.assertEqual(Document.from_bytes(data), document)
+        self.assertEqual(pickle.loads(pickle.dumps(document)), document)
+
+    def test_invalid_bytes(self):
+        data = markdown_to_document(MARKDOWN).to_bytes()
+        with self.assertRaises(ValueError):
+            Document.from_bytes(b"garbage")
+        with self.assertRaises(ValueError):
+            Document.from_bytes(data[:-3])
+        with self.assertRaises(ValueError):
+            Document.from_bytes(data[:len(IR_MAGIC)] + b"\x02" + data[len(IR_MAGIC) + 1:])
+
+    def test_plain_text(self):
+        text = markdown_to_document(MARKDOWN).to_text()
+        self.assertEqual(
+            text.split("\n")[:6],
+            [
+                "The Hobbit",
+                "A paragraph with italic, code and a link and an image.",
+                "a quote",
+                "over lines",
+                "one",
+                "two",
+            ],
+        )
+        self.assertIn("def f():", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
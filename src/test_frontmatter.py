@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import pagecache
+from conversions import generate_page
+from frontmatter import read_metadata, scan_metadata, split_front_matter, template_variables
+
+PAGE = """---
+title: "Why Tom Bombadil Was a Mistake"
+date: 2024-03-01
+tags: [tolkien, opinion]
+authors:
+  - Lane
+  - Tom
+# not a key
+---
+
+# Tom
+
+Body text
+"""
+
+
+class TestFrontMatter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        pagecache.configure(None)
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+        return path
+
+    def test_split_front_matter(self):
+        meta, body = split_front_matter(PAGE)
+        self.assertEqual(
+            meta,
+            {
+                "title": "Why Tom Bombadil Was a Mistake",
+                "date": "2024-03-01",
+                "tags": ["tolkien", "opinion"],
+                "authors": ["Lane", "Tom"],
+            },
+        )
+        self.assertEqual(body, "\n# Tom\n\nBody text\n")
+
+    def test_pages_without_front_matter(self):
+        self.assertEqual(split_front_matter("# Title\n\n---\n"), ({}, "# Title\n\n---\n"))
+        self.assertEqual(split_front_matter("---\nno closing line"), ({}, "---\nno closing line"))
+
+    def test_leading_thematic_break_is_not_front_matter(self):
+        for markdown in ("---\n\nIntro para\n\n---\n\nMore", "---\n\n# Title\n\nsome: thing\n\n---\n", "---\njust words\n---\n# Title"):
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+            self.assertEqual(read_metadata(self.write("page.md", markdown)), {})
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle: Title\njust words\n---\n# Title")
+        with self.assertRaises(ValueError):
+            read_metadata(self.write("page.md", "---\ntitle: Title\njust words\n---\n# Title"))
+
+    def test_delimiters_match_in_both_readers(self):
+        markdown = "---  \ntitle: Spaced\n---\t\n # not a delimiter\n ---\n# Body"
+        meta, body = split_front_matter(markdown)
+        self.assertEqual(meta, {"title": "Spaced"})
+        self.assertEqual(read_metadata(self.write("page.md", markdown)), meta)
+
+    def test_read_metadata_stops_at_header(self):
+        path = self.write("page.md", PAGE.encode() + b"\xff\xfe not utf-8")
+        self.assertEqual(read_metadata(path)["date"], "2024-03-01")
+        self.assertEqual(read_metadata(self.write("plain.md", "# Plain")), {})
+        self.assertEqual(read_metadata(self.write("huge.md", "---\n" + "a: b\n" * 100), max_bytes=64), {})
+
+    def test_scan_metadata(self):
+        self.write(os.path.join("content", "a.md"), PAGE)
+        self.write(os.path.join("content", "blog", "b.md"), "# B")
+        metadata = scan_metadata(os.path.join(self.tmp.name, "content"))
+        self.assertEqual([os.path.basename(path) for path in metadata], ["a.md", "b.md"])
+        self.assertEqual(metadata[os.path.join(self.tmp.name, "content", "blog", "b.md")], {})
+
+    def test_template_variables(self):
+        self.assertEqual(template_variables({"date": "2024", "tags": ["a", "b"]}), {"Date": "2024", "Tags": "a, b"})
+
+    def test_generate_page_uses_front_matter(self):
+        template = self.write("template.html", "<title>{{ Title }}</title><time>{{ Date }}</time>{{ Content }}")
+        source = self.write("page.md", PAGE)
+        outputs = []
+        for directory in (None, os.path.join(self.tmp.name, "cache")):
+            pagecache.configure(directory)
+            dest = os.path.join(self.tmp.name, "page.html")
+            with redirect_stdout(StringIO()):
+                meta = generate_page(source, template, dest, "/")
+            with open(dest) as f:
+                outputs.append(f.read())
+        self.assertEqual(meta["title"], "Why Tom Bombadil Was a Mistake")
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(
+            outputs[0],
+            "<title>Why Tom Bombadil Was a Mistake</title><time>2024-03-01</time>"
+            "<div><h1>Tom</h1><p>Body text</p></div>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import io
 import unittest
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, escape_attribute, escape_text
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_multi(self):
@@ -70,3 +71,53 @@ class TestHTMLNode(unittest.TestCase):
             parent_node.to_html(),
             "<p><a>https://www.link.com</a><b>Bold Text</b></p>"
         )
+
+    def test_iter_html_fragments(self):
+        parent_node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        self.assertEqual(
+            list(parent_node.iter_html()),
+            ["<p>", "<b>bold</b>", " text", "</p>"],
+        )
+
+    def test_write_html(self):
+        parent_node = ParentNode("div", [ParentNode("span", [LeafNode("i", "x")])])
+        buffer = io.StringIO()
+        parent_node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), parent_node.to_html())
+
+    def test_to_html_deeply_nested(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertTrue(html.endswith("</span></span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + len("<b>deep</b>"))
+
+    def test_parent_to_html_with_props(self):
+        parent_node = ParentNode("div", [LeafNode("b", "x")], {"class": "note"})
+        self.assertEqual(parent_node.to_html(), '<div class="note"><b>x</b></div>')
+
+    def test_iter_html_invalid_nested_child(self):
+        parent_node = ParentNode("div", [ParentNode("span", ["bad"])])
+        with self.assertRaises(ValueError):
+            list(parent_node.iter_html())
+
+    def test_leaf_values_are_escaped(self):
+        self.assertEqual(LeafNode("code", 'a < b && "c" > d').to_html(), '<code>a &lt; b &amp;&amp; "c" &gt; d</code>')
+        self.assertEqual(LeafNode(None, "<script>").to_html(), "&lt;script&gt;")
+
+    def test_props_are_escaped(self):
+        node = LeafNode("a", "x", {"href": "/search?q=a&b=<c>", "title": 'say "hi"'})
+        self.assertEqual(node.to_html(), '<a href="/search?q=a&amp;b=&lt;c&gt;" title="say &quot;hi&quot;">x</a>')
+        self.assertEqual(node.to_html(lambda url: url + "&x"), '<a href="/search?q=a&amp;b=&lt;c&gt;&amp;x" title="say &quot;hi&quot;">x</a>')
+
+    def test_plain_strings_are_returned_unchanged(self):
+        value = "nothing to escape here"
+        self.assertIs(escape_text(value), value)
+        self.assertIs(escape_attribute(value), value)
+        self.assertEqual(escape_text("&amp;"), "&amp;amp;")
+
+    def test_nodes_are_slotted(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [LeafNode("b", "x")])):
+            self.assertFalse(hasattr(node, "__dict__"))
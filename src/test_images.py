@@ -0,0 +1,108 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import images
+import main
+import pagecache
+from conversions import basepath_rewriter, markdown_to_html_node
+from images import ImageStage, image_size
+from inlinecache import shared_cache
+from manifest import BuildManifest
+
+
+def png_bytes(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+
+
+def jpeg_bytes(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.cache = os.path.join(root, ".build", "images")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(os.path.join(self.docs, "images"))
+        self.write(os.path.join(self.static, "images", "wide.png"), png_bytes(1200, 600))
+        self.write(os.path.join(self.static, "images", "photo.jpg"), jpeg_bytes(640, 480))
+        self.manifest = BuildManifest(os.path.join(root, ".build", "manifest.json"))
+
+    def tearDown(self):
+        images.active_images.clear()
+        shared_cache.clear()
+        self.tmp.cleanup()
+
+    def write(self, path, data):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def test_image_size(self):
+        self.assertEqual(image_size(os.path.join(self.static, "images", "wide.png")), (1200, 600))
+        self.assertEqual(image_size(os.path.join(self.static, "images", "photo.jpg")), (640, 480))
+        gif = os.path.join(self.static, "anim.gif")
+        self.write(gif, b"GIF89a" + struct.pack("<HH", 32, 16))
+        self.assertEqual(image_size(gif), (32, 16))
+        text = os.path.join(self.static, "notes.png")
+        self.write(text, b"not an image")
+        self.assertIsNone(image_size(text))
+
+    def test_img_nodes_are_annotated(self):
+        stage = ImageStage(self.static, self.docs, self.manifest, self.cache)
+        self.assertEqual(len(stage.run()), 2)
+        html = markdown_to_html_node("![wide](/images/wide.png) ![x](/elsewhere.png)").to_html()
+        self.assertIn('<img src="/images/wide.png" alt="wide" width="1200" height="600" loading="lazy"></img>', html)
+        self.assertIn('<img src="/elsewhere.png" alt="x"></img>', html)
+        self.assertEqual(ImageStage(self.static, self.docs, self.manifest, self.cache).run(), [])
+
+    def test_cached_derivatives_become_srcset(self):
+        # Stands in for a Pillow run: the cached result lists one derivative.
+        stage = ImageStage(self.static, self.docs, self.manifest, self.cache)
+        path = os.path.join(self.static, "images", "wide.png")
+        digest = self.manifest.digest(path)
+        os.makedirs(self.cache)
+        self.write(os.path.join(self.cache, f"{digest}-480.png"), png_bytes(480, 240))
+        stage.index[digest] = {"width": 1200, "height": 600, "derivatives": [480]}
+        stage.run()
+        derivative = f"/images/wide.{digest[:8]}.480w.png"
+        self.assertTrue(os.path.isfile(os.path.join(self.docs, derivative[1:])))
+        html = markdown_to_html_node("![wide](/images/wide.png)").to_html(basepath_rewriter("/base/"))
+        self.assertIn(f'srcset="/base{derivative} 480w, /base/images/wide.png 1200w"', html)
+
+
+    def test_build_annotates_images(self):
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "content"))
+        with open(os.path.join(root, "content", "index.md"), "w") as f:
+            f.write("# Home\n\n![wide](/images/wide.png)")
+        with open(os.path.join(root, "template.html"), "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        cwd = os.getcwd()
+        argv = sys.argv
+        self.addCleanup(pagecache.configure, None)
+        for args in ([], ["--jobs", "2"], ["--pipeline"]):
+            shared_cache.clear()
+            os.chdir(root)
+            sys.argv = ["main.py", "--images", *args]
+            try:
+                with redirect_stdout(StringIO()):
+                    main.main()
+            finally:
+                os.chdir(cwd)
+                sys.argv = argv
+            with open(os.path.join(self.docs, "index.html")) as f:
+                self.assertIn('<img src="/images/wide.png" alt="wide" width="1200" height="600" loading="lazy"></img>', f.read())
+            os.remove(os.path.join(root, ".build", "manifest.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
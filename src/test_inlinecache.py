@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from conversions import InlineRenderer, markdown_to_html_node, text_node_to_html_node
+from inlinecache import InlineCache
+from textnode import TextNode, TextType
+
+
+class TestInlineCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = InlineCache()
+        render_inline = InlineRenderer(cache=cache)
+        first = render_inline("A **footer** [link](/about)")
+        second = render_inline("A **footer** [link](/about)")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNot(first, second)
+        self.assertEqual([node.to_html() for node in first], [node.to_html() for node in second])
+
+    def test_lru_eviction(self):
+        cache = InlineCache(maxsize=2)
+        cache.put("a", [], [])
+        cache.put("b", [], [])
+        cache.get("a")
+        cache.put("c", [], [])
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_disabled_and_long_texts_are_not_stored(self):
+        disabled = InlineCache(maxsize=0)
+        InlineRenderer(cache=disabled)("text")
+        self.assertEqual(len(disabled), 0)
+        cache = InlineCache(max_text_length=10)
+        InlineRenderer(cache=cache)("a much longer paragraph")
+        self.assertEqual(len(cache), 0)
+
+    def test_cached_render_matches_uncached(self):
+        md = "- [Home](/)\n- [Blog](/blog)\n\n- [Home](/)\n- [Blog](/blog)"
+        cached = markdown_to_html_node(md).to_html()
+        uncached = markdown_to_html_node(md)
+        self.assertEqual(cached, uncached.to_html())
+        self.assertEqual(cached.count('<a href="/">Home</a>'), 2)
+
+    def test_save_and_load(self):
+        cache = InlineCache()
+        InlineRenderer(cache=cache)("see [docs](/docs) and **this**")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "inline.json")
+            cache.save(path)
+            loaded = InlineCache()
+            self.assertEqual(loaded.load(path, text_node_to_html_node), 1)
+        text_nodes, html_nodes = loaded.get("see [docs](/docs) and **this**")
+        self.assertEqual(text_nodes[1], TextNode("docs", TextType.LINK, "/docs"))
+        self.assertEqual(html_nodes[1].to_html(), '<a href="/docs">docs</a>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from conversions import generate_pages_recursion
+from manifest import BuildManifest, hash_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.docs)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPost")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.begin(self.template, basepath)
+        generate_pages_recursion(self.content, self.template, self.docs, basepath, manifest)
+        removed = manifest.prune(self.docs)
+        manifest.save()
+        return manifest, removed
+
+    def mtime(self, *parts):
+        return os.stat(os.path.join(self.docs, *parts)).st_mtime_ns
+
+    def test_hash_file(self):
+        other = os.path.join(self.root, "copy.md")
+        self.write(other, "# Home\n\nHello")
+        self.assertEqual(hash_file(other), hash_file(os.path.join(self.content, "index.md")))
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        before = self.mtime("index.html")
+        os.utime(os.path.join(self.docs, "index.html"), ns=(1, 1))
+        self.build()
+        self.assertEqual(self.mtime("index.html"), 1)
+        self.assertNotEqual(before, 1)
+
+    def test_dirty_page_is_rebuilt(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "index.html"), ns=(1, 1))
+        os.utime(os.path.join(self.docs, "blog", "index.html"), ns=(1, 1))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.build()
+        self.assertNotEqual(self.mtime("index.html"), 1)
+        self.assertEqual(self.mtime("blog", "index.html"), 1)
+
+    def test_touched_but_identical_source_is_skipped(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "index.html"), ns=(1, 1))
+        os.utime(os.path.join(self.content, "index.md"), ns=(5, 5))
+        self.build()
+        self.assertEqual(self.mtime("index.html"), 1)
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "blog", "index.html"), ns=(1, 1))
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertNotEqual(self.mtime("blog", "index.html"), 1)
+
+    def test_basepath_change_rebuilds_everything(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "blog", "index.html"), ns=(1, 1))
+        self.build("/site/")
+        self.assertNotEqual(self.mtime("blog", "index.html"), 1)
+
+    def test_orphaned_output_is_removed(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        _, removed = self.build()
+        self.assertEqual(removed, [os.path.join(self.docs, "blog", "index.html")])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "index.html"))
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import conversions
+import pagecache
+from blocktype import BlockType
+from conversions import basepath_rewriter, generate_page, markdown_to_html_node, page_content, register_block_handler
+from htmlnode import ParentNode
+from pagecache import PageCache, mark_url, unmark_urls
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "pages")
+
+    def tearDown(self):
+        pagecache.configure(None)
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        cache = PageCache(self.cache_dir)
+        self.assertIsNone(cache.get("# Title"))
+        cache.put("# Title", "Title", "<div><h1>Title</h1></div>")
+        self.assertEqual(cache.get("# Title"), ("Title", "<div><h1>Title</h1></div>"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_parser_version_is_part_of_key(self):
+        cache = PageCache(self.cache_dir)
+        key = cache.key("# Title")
+        saved_version = pagecache.PARSER_VERSION
+        pagecache.PARSER_VERSION = "test"
+        try:
+            self.assertNotEqual(key, cache.key("# Title"))
+        finally:
+            pagecache.PARSER_VERSION = saved_version
+
+    def test_registered_handlers_are_part_of_key(self):
+        source = os.path.join(self.tmp.name, "page.md")
+        template = os.path.join(self.tmp.name, "template.html")
+        dest = os.path.join(self.tmp.name, "docs", "page.html")
+        with open(source, "w") as f:
+            f.write("# Title\n\nbody")
+        with open(template, "w") as f:
+            f.write("{{ Content }}")
+        pagecache.configure(self.cache_dir)
+        saved_handler = conversions.BLOCK_HANDLERS[BlockType.PARAGRAPH]
+        self.addCleanup(conversions.BLOCK_HANDLERS.__setitem__, BlockType.PARAGRAPH, saved_handler)
+        with redirect_stdout(StringIO()):
+            generate_page(source, template, dest, "/")
+            register_block_handler(BlockType.PARAGRAPH, lambda block, render_inline: ParentNode("section", render_inline(block.text)))
+            generate_page(source, template, dest, "/")
+        with open(dest) as f:
+            self.assertEqual(f.read(), "<div><h1>Title</h1><section>body</section></div>")
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = PageCache(self.cache_dir)
+        path = cache.path(cache.key("# Title"))
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"garbage")
+        self.assertIsNone(cache.get("# Title"))
+
+    def test_url_markers(self):
+        body = f'<a href="{mark_url("/blog")}">href="/blog"</a>'
+        self.assertEqual(unmark_urls(body), '<a href="/blog">href="/blog"</a>')
+        self.assertEqual(
+            unmark_urls(body, basepath_rewriter("/site/")),
+            '<a href="/site/blog">href="/blog"</a>',
+        )
+
+    def test_cached_body_is_rewrapped_for_a_new_basepath(self):
+        pagecache.configure(self.cache_dir)
+        markdown = "# Home\n\n[About](/about) ![me](/images/me.png)"
+        title, body = page_content(markdown, basepath_rewriter("/"))
+        self.assertEqual(title, "Home")
+        self.assertEqual(pagecache.active_cache.misses, 1)
+        title, body = page_content(markdown, basepath_rewriter("/site/"))
+        self.assertEqual(pagecache.active_cache.hits, 1)
+        self.assertEqual(
+            body,
+            '<div><h1>Home</h1><p><a href="/site/about">About</a> '
+            '<img src="/site/images/me.png" alt="me"></img></p></div>',
+        )
+
+    def test_escaped_urls_are_rewritten_unescaped(self):
+        pagecache.configure(self.cache_dir)
+        markdown = '# A & B\n\n[q](/search?a=1&b="2")'
+        direct = markdown_to_html_node(markdown).to_html(basepath_rewriter("/site/"))
+        page_content(markdown, basepath_rewriter("/"))
+        _, body = page_content(markdown, basepath_rewriter("/site/"))
+        self.assertEqual(pagecache.active_cache.hits, 1)
+        self.assertEqual(body, direct)
+        self.assertIn('<h1>A &amp; B</h1>', body)
+        self.assertIn('href="/site/search?a=1&amp;b=&quot;2&quot;"', body)
+
+    def test_generate_page_with_cache_matches_without(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        source = os.path.join(self.tmp.name, "index.md")
+        with open(template, "w") as f:
+            f.write('<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        with open(source, "w") as f:
+            f.write("# Home\n\n- [a](/a)\n- b")
+        outputs = []
+        for directory in (None, self.cache_dir, self.cache_dir):
+            pagecache.configure(directory)
+            dest = os.path.join(self.tmp.name, "out.html")
+            with redirect_stdout(StringIO()):
+                generate_page(source, template, dest, "/base/")
+            with open(dest) as f:
+                outputs.append(f.read())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+
+    def test_evict_oldest_entries(self):
+        cache = PageCache(self.cache_dir, max_bytes=120)
+        for i in range(3):
+            cache.put(f"# Page {i}", f"Page {i}", "x" * 40)
+            os.utime(cache.path(cache.key(f"# Page {i}")), ns=(i + 1, i + 1))
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get("# Page 0"))
+        self.assertIsNotNone(cache.get("# Page 2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+import assets
+import compress
+from conversions import generate_pages_recursion
+from parallel import chunk_pages, collect_pages, generate_pages_parallel
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "post"))
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\n- a\n- b")
+        for i in range(10):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# Page {i}\n\n**{i}**")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_tree(self, directory):
+        files = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, directory)] = f.read()
+        return files
+
+    def test_collect_pages(self):
+        docs = os.path.join(self.root, "docs")
+        pages = collect_pages(self.content, docs)
+        self.assertEqual(pages[0], (os.path.join(self.content, "blog", "p0.md"), os.path.join(docs, "blog", "p0.html")))
+        self.assertEqual(pages[-1], (os.path.join(self.content, "index.md"), os.path.join(docs, "index.html")))
+        self.assertEqual(len(pages), 12)
+
+    def test_chunk_pages(self):
+        chunks = chunk_pages(list(range(100)), 2)
+        self.assertEqual(sum(chunks, []), list(range(100)))
+        self.assertEqual(len(chunks[0]), 12)
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        os.makedirs(serial)
+        generate_pages_recursion(self.content, self.template, serial, "/base/")
+        pages = collect_pages(self.content, parallel)
+        generate_pages_parallel(pages, self.template, "/base/", 3)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_spawned_workers_get_the_build_state(self):
+        serial = os.path.join(self.root, "serial")
+        spawned = os.path.join(self.root, "spawned")
+        os.makedirs(serial)
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}' + "<p>footer</p>" * 30)
+        assets.active_fingerprints.update({"/index.css": "/index.0123abcd.css"})
+        self.addCleanup(assets.active_fingerprints.clear)
+        generate_pages_recursion(self.content, self.template, serial, "/base/")
+        compress.configure(spawned, os.path.join(self.root, "compress.json"), 1, 1)
+        self.addCleanup(compress.configure, None)
+        pages = collect_pages(self.content, spawned)
+        generate_pages_parallel(pages, self.template, "/base/", 2, mp_context=multiprocessing.get_context("spawn"))
+        compress.active_compressor.wait()
+        self.assertEqual(compress.active_compressor.compressed, 12)
+        files = self.read_tree(spawned)
+        self.assertIn(b"/base/index.0123abcd.css", files["index.html"])
+        self.assertEqual(self.read_tree(serial), {name: data for name, data in files.items() if not name.endswith(".gz")})
+
+    def test_errors_are_reported_in_page_order(self):
+        self.write(os.path.join(self.content, "blog", "p3.md"), "no title")
+        self.write(os.path.join(self.content, "blog", "p7.md"), "no title either")
+        pages = collect_pages(self.content, os.path.join(self.root, "docs"))
+        with self.assertRaises(ValueError) as cm:
+            generate_pages_parallel(pages, self.template, "/", 4)
+        message = str(cm.exception)
+        self.assertTrue(message.startswith("2 page(s) failed to build"))
+        self.assertLess(message.index("p3.md"), message.index("p7.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+import search
+from conversions import generate_pages_recursion
+from manifest import BuildManifest
+from parallel import collect_pages, generate_pages_parallel
+from writer import PageWriter, generate_pages_pipelined
+from search import SearchIndex, page_terms, term_shard
+from siteindex import SiteIndex
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.path = os.path.join(root, ".build", "search-index.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.docs)
+        self.a = self.write("index.md", "# Home\n\nWelcome to the **shire**")
+        self.b = self.write("blog/index.md", "# Blog\n\nShire news and [mordor](/mordor) news")
+
+    def tearDown(self):
+        search.configure(None, None)
+        self.tmp.cleanup()
+
+    def write(self, relative, text):
+        path = os.path.join(self.content, *relative.split("/"))
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def lookup(self, term):
+        directory = os.path.join(self.docs, "search")
+        try:
+            with open(os.path.join(directory, f"terms-{term_shard(term):02x}.json")) as f:
+                postings = json.load(f).get(term, [])
+        except FileNotFoundError:
+            return {}
+        with open(os.path.join(directory, "pages-0.json")) as f:
+            pages = json.load(f)
+        return {pages[str(postings[i])][0]: postings[i + 1] for i in range(0, len(postings), 2)}
+
+    def test_page_terms(self):
+        self.assertEqual(
+            page_terms("The Shire", ["the shire, the Shire!", "a b"]),
+            {"the": 2 + search.TITLE_WEIGHT, "shire": 2 + search.TITLE_WEIGHT},
+        )
+
+    def test_add_remove_and_reload(self):
+        index = SearchIndex(self.path, self.docs)
+        index.add(self.a, "/", "Home", {"home": 5, "shire": 1})
+        index.add(self.b, "/blog/", "Blog", {"shire": 1, "news": 2})
+        index.save()
+        self.assertEqual(self.lookup("shire"), {"/": 1, "/blog/": 1})
+
+        self.assertTrue(SearchIndex(self.path, self.docs).is_current(self.a, "/", "Home"))
+        index = SearchIndex(self.path, self.docs)
+        self.assertFalse(index.is_current(self.b, "/blog/", "News"))
+        index.add(self.b, "/blog/", "News", {"news": 7})
+        index.prune()
+        index.save()
+        self.assertEqual(self.lookup("shire"), {})
+        self.assertEqual(self.lookup("news"), {"/blog/": 7})
+        self.assertEqual(self.lookup("home"), {})
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.docs, "search"))),
+            ["index.json", "pages-0.json", f"terms-{term_shard('news'):02x}.json"],
+        )
+
+    def test_only_changed_shards_are_rewritten(self):
+        index = SearchIndex(self.path, self.docs)
+        index.add(self.a, "/", "Home", {"home": 1})
+        index.add(self.b, "/blog/", "Blog", {"blog": 1})
+        index.save()
+        home_shard = os.path.join(self.docs, "search", f"terms-{term_shard('home'):02x}.json")
+        os.utime(home_shard, ns=(1, 1))
+        index = SearchIndex(self.path, self.docs)
+        index.add(self.b, "/blog/", "Blog", {"blog": 2})
+        index.save()
+        self.assertEqual(os.stat(home_shard).st_mtime_ns, 1)
+        self.assertEqual(self.lookup("blog"), {"/blog/": 2})
+
+    def test_missing_shards_reindex_everything(self):
+        index = SearchIndex(self.path, self.docs)
+        index.add(self.a, "/", "Home", {"home": 1})
+        index.save()
+        os.remove(os.path.join(self.docs, "search", "index.json"))
+        index = SearchIndex(self.path, self.docs)
+        self.assertFalse(index.is_current(self.a, "/", "Home"))
+
+    def test_urls_carry_the_basepath(self):
+        index = SearchIndex(self.path, self.docs, "/base/")
+        index.add(self.a, "/", "Home", {"shire": 1})
+        index.add(self.b, "/blog/", "Blog", {"shire": 2})
+        index.save()
+        self.assertEqual(self.lookup("shire"), {"/base/": 1, "/base/blog/": 2})
+        with open(os.path.join(self.docs, "search", "index.json")) as f:
+            self.assertEqual(json.load(f)["basepath"], "/base/")
+
+        index = SearchIndex(self.path, self.docs)
+        self.assertFalse(index.is_current(self.a, "/", "Home"))
+        index.add(self.a, "/", "Home", {"home": 1})
+        index.save()
+        self.assertEqual(self.lookup("shire"), {})
+        self.assertEqual(self.lookup("home"), {"/": 1})
+
+    def test_batches_are_flushed(self):
+        saved = search.FLUSH_POSTINGS
+        search.FLUSH_POSTINGS = 2
+        try:
+            index = SearchIndex(self.path, self.docs)
+            index.add(self.a, "/", "Home", {"home": 1, "shire": 1})
+            self.assertEqual(index.postings, {})
+            index.add(self.b, "/blog/", "Blog", {"shire": 3})
+            index.save()
+        finally:
+            search.FLUSH_POSTINGS = saved
+        self.assertEqual(self.lookup("shire"), {"/": 1, "/blog/": 3})
+
+    def test_built_during_the_page_pass(self):
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as f:
+            f.write("{{ Title }}{{ Content }}")
+        index = search.configure(self.path, self.docs)
+        site = SiteIndex(os.path.join(self.tmp.name, ".build", "site-index.json"), self.docs)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursion(self.content, template, self.docs, "/", site=site)
+        site.prune()
+        index.save()
+        self.assertEqual(self.lookup("shire"), {"/": 1, "/blog/": 1})
+        self.assertEqual(self.lookup("mordor"), {"/blog/": 1})
+        self.assertEqual(self.lookup("home"), {"/": search.TITLE_WEIGHT + 1})
+        self.assertNotIn(search.SEARCH_TERMS, site.pages[self.a]["meta"])
+
+        # A kept page the index has not seen is read from its source.
+        os.remove(self.path)
+        index = search.configure(self.path, self.docs)
+        site.keep(self.b, os.path.join(self.docs, "blog", "index.html"))
+        index.save()
+        self.assertEqual(self.lookup("news"), {"/blog/": 2})
+
+
+    def build_site(self, mode, name):
+        # Builds content into its own docs and .build directories and
+        # returns the search shards.
+        docs = os.path.join(self.tmp.name, name, "docs")
+        build = os.path.join(self.tmp.name, name, ".build")
+        os.makedirs(docs, exist_ok=True)
+        template = os.path.join(self.tmp.name, "template.html")
+        manifest = BuildManifest(os.path.join(build, "manifest.json"))
+        manifest.begin(template, "/")
+        index = search.configure(os.path.join(build, "search-index.json"), docs)
+        site = SiteIndex(os.path.join(build, "site-index.json"), docs)
+        with redirect_stdout(StringIO()):
+            if mode == "serial":
+                generate_pages_recursion(self.content, template, docs, "/", manifest, None, site)
+            elif mode == "parallel":
+                generate_pages_parallel(collect_pages(self.content, docs), template, "/", 3, manifest, None, site)
+            else:
+                writer = PageWriter().start()
+                generate_pages_pipelined(collect_pages(self.content, docs), template, "/", writer, 3, manifest, site)
+        site.prune()
+        index.save()
+        manifest.save()
+        directory = os.path.join(docs, "search")
+        shards = {}
+        for shard in os.listdir(directory):
+            with open(os.path.join(directory, shard), "rb") as f:
+                shards[shard] = f.read()
+        return shards
+
+    def test_shards_do_not_depend_on_the_build_mode(self):
+        with open(os.path.join(self.tmp.name, "template.html"), "w") as f:
+            f.write("{{ Title }}{{ Content }}")
+        for i in range(12):
+            self.write(f"blog/p{i:02}.md", f"# Post {i}\n\nWords {i} about the shire")
+        builds = {mode: [self.build_site(mode, mode)] for mode in ("serial", "parallel", "pipelined")}
+        # A second build mixes kept, changed and new pages.
+        self.write("blog/p03.md", "# Post 3\n\nRewritten")
+        os.remove(os.path.join(self.content, "blog", "p05.md"))
+        self.write("blog/extra.md", "# Extra\n\nA late shire page")
+        for mode, shards in builds.items():
+            shards.append(self.build_site(mode, mode))
+        self.assertIn("pages-0.json", builds["serial"][0])
+        self.assertEqual(builds["parallel"], builds["serial"])
+        self.assertEqual(builds["pipelined"], builds["serial"])
+
+
+if __name__ == "__main__":
+    unittest.main()
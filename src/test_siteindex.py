@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from conversions import generate_pages_recursion
+from manifest import BuildManifest
+from siteindex import SiteArtifacts, SiteIndex, atom_feed, sitemap_xml
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.index_path = os.path.join(root, ".build", "site-index.json")
+        os.makedirs(os.path.join(self.content, "blog", "old"))
+        os.makedirs(os.path.join(self.content, "blog", "new"))
+        os.makedirs(self.docs)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello", 1)
+        self.write(os.path.join(self.content, "blog", "old", "index.md"), "# Old & busted\n\nText", 2 * 10**18)
+        self.write(os.path.join(self.content, "blog", "new", "index.md"), "# New\n\nText", 3 * 10**18)
+        self.manifest = BuildManifest(os.path.join(root, ".build", "manifest.json"))
+        self.site = self.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text, mtime=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+
+    def build(self):
+        site = SiteIndex(self.index_path, self.docs)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursion(self.content, self.template, self.docs, "/", self.manifest, None, site)
+        site.prune()
+        site.save()
+        return site
+
+    def test_pages_are_indexed(self):
+        self.assertEqual([entry["url"] for entry in self.site.entries()], ["/", "/blog/new/", "/blog/old/"])
+        self.assertEqual(self.site.pages[os.path.join(self.content, "blog", "old", "index.md")]["title"], "Old & busted")
+
+    def test_fresh_pages_keep_their_entry_without_reading(self):
+        os.remove(self.template)
+        site = self.build()
+        self.assertEqual(site.pages, self.site.pages)
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual([entry["url"] for entry in self.build().entries()], ["/blog/new/", "/blog/old/"])
+
+    def test_sitemap_and_feed(self):
+        sitemap = sitemap_xml(self.site, "https://example.com", lambda url: "/base" + url)
+        self.assertIn("<loc>https://example.com/base/blog/old/</loc><lastmod>2033-05-18</lastmod>", sitemap)
+        feed = atom_feed(self.site, "https://example.com", "Blog", "/blog/")
+        self.assertLess(feed.index("<title>New</title>"), feed.index("<title>Old &amp; busted</title>"))
+        self.assertNotIn("<title>Home</title>", feed)
+
+    def test_feed_authors(self):
+        feed = atom_feed(self.site, "https://example.com", "Blog", "/blog/")
+        self.assertIn("  <author><name>Blog</name></author>", feed)
+        self.write(os.path.join(self.content, "blog", "new", "index.md"), "---\nauthor: Sam & Rosie\n---\n# New\n\nText", 4 * 10**18)
+        feed = atom_feed(self.build(), "https://example.com", "Blog", "/blog/", author="Frodo")
+        self.assertIn("  <author><name>Frodo</name></author>", feed)
+        self.assertIn("    <author><name>Sam &amp; Rosie</name></author>", feed)
+        self.assertEqual(feed.count("<author>"), 2)
+
+    def test_artifacts_are_written_only_when_changed(self):
+        artifacts = SiteArtifacts(self.site, self.template, "/", "https://example.com", listings=True)
+        written = artifacts.write()
+        self.assertEqual(
+            written,
+            [os.path.join(self.docs, "blog", "index.html"), os.path.join(self.docs, "feed.xml"), os.path.join(self.docs, "sitemap.xml")],
+        )
+        with open(written[0]) as f:
+            self.assertIn('<li><a href="/blog/new/">New</a></li><li><a href="/blog/old/">Old &amp; busted</a></li>', f.read())
+        self.assertEqual(artifacts.write(), [])
+
+    def test_front_matter_feeds_tags_and_dates(self):
+        self.write(
+            os.path.join(self.content, "blog", "old", "index.md"),
+            "---\ndate: 2020-01-01\ntags: [Middle Earth]\n---\n# Old & busted\n\nText",
+        )
+        site = self.build()
+        old = site.pages[os.path.join(self.content, "blog", "old", "index.md")]
+        self.assertEqual(old["meta"], {"date": "2020-01-01", "tags": ["Middle Earth"]})
+        SiteArtifacts(site, self.template, "/", listings=True).write()
+        self.assertTrue(os.path.isfile(os.path.join(self.docs, "tags", "middle-earth", "index.html")))
+        self.assertTrue(os.path.isfile(os.path.join(self.docs, "tags", "index.html")))
+
+    def test_pages_win_over_tag_artifacts(self):
+        self.write(
+            os.path.join(self.content, "blog", "old", "index.md"),
+            "---\ntags: [Middle Earth]\n---\n# Old & busted\n\nText",
+        )
+        os.makedirs(os.path.join(self.content, "tags", "middle-earth"))
+        self.write(os.path.join(self.content, "tags", "middle-earth", "index.md"), "# Hand written")
+        site = self.build()
+        with redirect_stdout(StringIO()) as output:
+            written = SiteArtifacts(site, self.template, "/", listings=True).write()
+        self.assertIn("Skipping generated tags/middle-earth/index.html", output.getvalue())
+        self.assertEqual(written, [os.path.join(self.docs, "blog", "index.html"), os.path.join(self.docs, "tags", "index.html")])
+        with open(os.path.join(self.docs, "tags", "middle-earth", "index.html")) as f:
+            self.assertIn("<h1>Hand written</h1>", f.read())
+
+    def test_stale_artifacts_are_removed(self):
+        listing = os.path.join(self.docs, "blog", "index.html")
+        SiteArtifacts(self.site, self.template, "/", listings=True).write()
+        self.assertTrue(os.path.isfile(listing))
+        self.assertEqual(SiteArtifacts(self.site, self.template, "/").write(), [listing])
+        self.assertFalse(os.path.exists(listing))
+
+
+if __name__ == "__main__":
+    unittest.main()
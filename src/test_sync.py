@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from manifest import BuildManifest
+from sync import sync_file, sync_tree
+
+
+class TestSyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png-a")
+        self.write(os.path.join(self.static, "images", "b.png"), "png-b")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def test_first_sync_copies_everything(self):
+        result = sync_tree(self.static, self.docs)
+        self.assertEqual((result.copied, result.skipped, result.directories), (3, 0, 1))
+        self.assertEqual(self.read("images", "b.png"), "png-b")
+
+    def test_unchanged_files_are_skipped(self):
+        sync_tree(self.static, self.docs)
+        self.write(os.path.join(self.static, "images", "a.png"), "png-a2")
+        result = sync_tree(self.static, self.docs, jobs=2)
+        self.assertEqual((result.copied, result.skipped), (1, 2))
+        self.assertEqual(self.read("images", "a.png"), "png-a2")
+
+    def test_hardlink_mode(self):
+        result = sync_tree(self.static, self.docs, mode="hardlink")
+        self.assertEqual(result.linked, 3)
+        self.assertTrue(os.path.samefile(os.path.join(self.static, "index.css"), os.path.join(self.docs, "index.css")))
+        self.assertEqual(sync_tree(self.static, self.docs, mode="hardlink").skipped, 3)
+
+    def test_copy_never_writes_through_hardlink(self):
+        sync_tree(self.static, self.docs, mode="hardlink")
+        source = os.path.join(self.static, "index.css")
+        dest = os.path.join(self.docs, "index.css")
+        os.remove(source)
+        self.write(source, "body { color: red }")
+        os.link(dest, os.path.join(self.tmp.name, "extra-link"))
+        sync_file(source, dest)
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+        with open(os.path.join(self.tmp.name, "extra-link")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            sync_tree(self.static, self.docs, mode="symlink")
+
+    def test_manifest_is_recorded(self):
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        sync_tree(self.static, self.docs, manifest=manifest)
+        self.assertEqual(len(manifest.entries), 3)
+        self.assertEqual(manifest.entries[os.path.join(self.static, "index.css")]["output"], os.path.join(self.docs, "index.css"))
+        self.assertEqual(manifest.prune(self.docs), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from conversions import basepath_rewriter
+from htmlnode import LeafNode, ParentNode
+from template import LITERAL, URL, VARIABLE, Template, TrustedHTML, load_template, parse_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_parse_template(self):
+        segments = parse_template('<title>{{ Title }}</title><link href="/index.css" />{{Content}}')
+        self.assertListEqual(
+            [
+                (LITERAL, "<title>"),
+                (VARIABLE, "Title"),
+                (LITERAL, '</title><link href="'),
+                (URL, "/index.css"),
+                (LITERAL, '" />'),
+                (VARIABLE, "Content"),
+            ],
+            segments,
+        )
+
+    def test_render_variables(self):
+        template = Template("<h1>{{ Title }}</h1><p>{{ Author }}</p>{{ Missing }}")
+        html = template.render({"Title": "Hello", "Author": "Tolkien"})
+        self.assertEqual(html, "<h1>Hello</h1><p>Tolkien</p>{{ Missing }}")
+
+    def test_string_variables_are_escaped(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}{{ Count }}")
+        html = template.render({"Title": "A & <B>", "Content": TrustedHTML("<p>x &amp; y</p>"), "Count": 3})
+        self.assertEqual(html, "<title>A &amp; &lt;B&gt;</title><p>x &amp; y</p>3")
+
+    def test_render_html_node(self):
+        template = Template("<article>{{ Content }}</article>")
+        content = ParentNode("p", [LeafNode("a", "home", {"href": "/"})])
+        html = template.render({"Content": content}, basepath_rewriter("/site/"))
+        self.assertEqual(html, '<article><p><a href="/site/">home</a></p></article>')
+
+    def test_basepath_only_touches_urls(self):
+        template = Template('<link href="/index.css" /><img src="https://x.com/a.png" />{{ Content }}')
+        content = ParentNode("p", [LeafNode(None, 'Write href="/path" in your markup')])
+        html = template.render({"Content": content}, basepath_rewriter("/site/"))
+        self.assertEqual(
+            html,
+            '<link href="/site/index.css" /><img src="https://x.com/a.png" />'
+            '<p>Write href="/path" in your markup</p>',
+        )
+
+    def test_basepath_skips_protocol_relative_urls(self):
+        rewrite_url = basepath_rewriter("/site/")
+        self.assertEqual(rewrite_url("//cdn.example.com/a.js"), "//cdn.example.com/a.js")
+        self.assertIsNone(basepath_rewriter("/"))
+
+    def test_load_template_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(first, load_template(path))
+            with open(path, "w") as f:
+                f.write("<b>{{ Title }}</b>")
+            os.utime(path, ns=(1, 1))
+            second = load_template(path)
+            self.assertIsNot(first, second)
+            self.assertEqual(second.render({"Title": "x"}), "<b>x</b>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -32,6 +32,11 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("A link", TextType.LINK , "http://example.com")
         node2 = TextNode("A link", TextType.LINK)
         self.assertNotEqual(node, node2)
+    def test_slots(self):
+        node = TextNode("A link", TextType.LINK, "http://example.com")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
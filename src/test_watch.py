@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from conversions import copy_files_recursion, generate_pages_recursion
+from manifest import BuildManifest
+from watch import SiteWatcher
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        for directory in (os.path.join(self.content, "blog"), self.static, self.docs):
+            os.makedirs(directory)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nPost")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        manifest = BuildManifest(os.path.join(root, ".build", "manifest.json"))
+        with redirect_stdout(StringIO()):
+            manifest.begin(self.template, "/")
+            copy_files_recursion(self.static, self.docs, manifest)
+            generate_pages_recursion(self.content, self.template, self.docs, "/", manifest)
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.docs, "/", manifest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text, mtime=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+
+    def poll(self):
+        with redirect_stdout(StringIO()):
+            return self.watcher.poll()
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as f:
+            return f.read()
+
+    def test_no_changes(self):
+        self.assertEqual(self.poll(), [])
+
+    def test_changed_page_only(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged", 10)
+        self.assertEqual(self.poll(), [os.path.join(self.docs, "index.html")])
+        self.assertIn("Changed", self.read("index.html"))
+
+    def test_new_and_removed_pages(self):
+        self.write(os.path.join(self.content, "blog", "new.md"), "# New\n\nPage", 10)
+        os.remove(os.path.join(self.content, "index.md"))
+        rebuilt = self.poll()
+        self.assertIn(os.path.join(self.docs, "blog", "new.html"), rebuilt)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_changed_static_file(self):
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }", 10)
+        self.assertEqual(self.poll(), [os.path.join(self.docs, "index.css")])
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_changed_static_file_keeps_link_mode(self):
+        self.watcher.link_mode = "hardlink"
+        source = os.path.join(self.static, "index.css")
+        self.write(source, "body { color: blue }", 10)
+        self.assertEqual(self.poll(), [os.path.join(self.docs, "index.css")])
+        self.assertTrue(os.path.samefile(source, os.path.join(self.docs, "index.css")))
+
+    def test_template_change_rebuilds_pages(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}", 10)
+        rebuilt = self.poll()
+        self.assertEqual(len(rebuilt), 2)
+        self.assertTrue(self.read("blog", "index.html").startswith("<h1>Blog</h1>"))
+
+    def test_broken_page_does_not_stop_watcher(self):
+        self.write(os.path.join(self.content, "index.md"), "no title", 10)
+        self.assertEqual(self.poll(), [])
+        self.write(os.path.join(self.content, "index.md"), "# Fixed\n\nok", 20)
+        self.assertEqual(self.poll(), [os.path.join(self.docs, "index.html")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from conversions import generate_pages_recursion
+from parallel import collect_pages
+from writer import PageWriter, generate_pages_pipelined
+
+
+class TestPageWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/p0)")
+        for i in range(6):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# Page {i}\n\n**{i}**")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read_tree(self, directory):
+        files = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, directory)] = f.read()
+        return files
+
+    def test_writer_batches_directories(self):
+        writer = PageWriter(max_queue=2, batch_size=4, atomic=True).start()
+        for i in range(5):
+            writer.submit(os.path.join(self.root, "out", "a", f"{i}.html"), f"page {i}")
+        writer.close()
+        self.assertEqual(writer.pages, 5)
+        self.assertEqual(writer.known_dirs, {os.path.join(self.root, "out", "a")})
+        self.assertEqual(sorted(os.listdir(os.path.join(self.root, "out", "a"))), [f"{i}.html" for i in range(5)])
+        self.assertLessEqual(writer.max_depth, 2)
+
+    def test_write_errors_surface_on_close(self):
+        self.write(os.path.join(self.root, "blocker"), "")
+        writer = PageWriter().start()
+        writer.submit(os.path.join(self.root, "blocker", "index.html"), "page")
+        with self.assertRaises(OSError):
+            writer.close()
+
+    def test_pipelined_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        os.makedirs(serial)
+        with redirect_stdout(StringIO()):
+            generate_pages_recursion(self.content, self.template, serial, "/base/")
+        for jobs in (1, 2):
+            docs = os.path.join(self.root, f"docs{jobs}")
+            writer = PageWriter(max_queue=1).start()
+            with redirect_stdout(StringIO()):
+                generate_pages_pipelined(collect_pages(self.content, docs), self.template, "/base/", writer, jobs)
+            self.assertEqual(self.read_tree(docs), self.read_tree(serial))
+
+    def test_pipelined_reports_failed_pages(self):
+        self.write(os.path.join(self.content, "broken.md"), "no **close")
+        docs = os.path.join(self.root, "docs")
+        writer = PageWriter().start()
+        with redirect_stdout(StringIO()), self.assertRaises(ValueError) as raised:
+            generate_pages_pipelined(collect_pages(self.content, docs), self.template, "/", writer)
+        self.assertIn("broken.md", str(raised.exception))
+        self.assertTrue(os.path.exists(os.path.join(docs, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
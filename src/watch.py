@@ -0,0 +1,183 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import compress
+import pagecache
+import search
+from conversions import generate_page
+from inlinecache import shared_cache
+from sync import sync_file
+
+
+def scan_files(paths):
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class SiteWatcher:
+    def __init__(self, content_directory, source_directory, template_path, target_directory, basepath, manifest, index=None, artifacts=None, assets=None, images=None, link_mode="copy"):
+        self.content_directory = content_directory
+        self.source_directory = source_directory
+        self.template_path = template_path
+        self.target_directory = target_directory
+        self.basepath = basepath
+        self.manifest = manifest
+        self.index = index
+        self.artifacts = artifacts
+        self.assets = assets
+        self.images = images
+        self.link_mode = link_mode
+        self.snapshot = self.scan()
+
+    def scan(self):
+        return scan_files([self.content_directory, self.source_directory, self.template_path])
+
+    def page_destination(self, from_path):
+        relative = os.path.relpath(from_path, self.content_directory)
+        return os.path.join(self.target_directory, relative).replace(".md", ".html")
+
+    def static_destination(self, from_path):
+        relative = os.path.relpath(from_path, self.source_directory)
+        return os.path.join(self.target_directory, relative)
+
+    def is_page(self, path):
+        return path.endswith(".md") and path.startswith(self.content_directory + os.sep)
+
+    def is_static(self, path):
+        return path.startswith(self.source_directory + os.sep)
+
+    def poll(self):
+        current = self.scan()
+        changed = sorted(path for path, signature in current.items() if self.snapshot.get(path) != signature)
+        removed = sorted(path for path in self.snapshot if path not in current)
+        self.snapshot = current
+        if not changed and not removed:
+            return []
+        start = time.perf_counter()
+        rebuilt = self.rebuild(changed, removed)
+        if rebuilt:
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {len(rebuilt)} file(s) in {elapsed:.1f} ms")
+        return rebuilt
+
+    def rebuild(self, changed, removed):
+        template_assets = None
+        if self.images is not None and any(self.is_static(p) for p in changed + removed):
+            token = self.images.token
+            self.images.run()
+            if self.images.token != token:
+                # Cached fragments and bodies still carry the old attributes.
+                shared_cache.clear()
+                if pagecache.active_cache is not None:
+                    pagecache.active_cache.salt = self.images.token
+        if self.assets is not None and any(self.is_static(p) for p in changed + removed):
+            # New fingerprints must be in place before any page is rendered;
+            # the pages linking to changed assets are found below.
+            self.assets.run()
+            template_assets = self.assets.template_fingerprints(self.template_path)
+        if self.template_path in changed or template_assets is not None:
+            # begin() drops every page entry when the template hash or the
+            # fingerprints it links change, so all pages fall through the
+            # freshness check below.
+            if template_assets is None and self.assets is not None:
+                template_assets = self.assets.template_fingerprints(self.template_path)
+            settings = dict(self.manifest.settings)
+            self.manifest.begin(self.template_path, self.basepath, template_assets)
+            if self.manifest.settings != settings:
+                changed = sorted(set(changed) | {p for p in self.snapshot if self.is_page(p)})
+
+        if self.index is not None:
+            # Pages linking to anything that changed, appeared or disappeared
+            # are rebuilt along with it, even though their own source is fresh.
+            self.index.refresh([p for p in changed if self.is_page(p)], [p for p in removed if self.is_page(p)])
+            for path in self.index.dependents(changed + removed):
+                if os.path.isfile(path):
+                    self.manifest.invalidate(path)
+                    changed.append(path)
+            changed = sorted(set(changed))
+            for source, url in self.index.broken_links():
+                if source in changed:
+                    print(f"Broken link in {source}: {url}")
+
+        rebuilt = []
+        for path in removed:
+            output = self.manifest.remove(path, self.target_directory)
+            if self.artifacts is not None and self.is_page(path):
+                self.artifacts.site.remove(path)
+            if output is not None:
+                print(f"Removing {output}")
+                rebuilt.append(output)
+
+        for path in changed:
+            if self.is_page(path):
+                dest_path = self.page_destination(path)
+                if self.manifest.is_fresh(path, dest_path):
+                    continue
+                try:
+                    meta = generate_page(path, self.template_path, dest_path, self.basepath)
+                except Exception as e:
+                    print(f"Error generating {path}: {type(e).__name__}: {e}")
+                    continue
+                self.manifest.record(path, dest_path, "page")
+                if self.artifacts is not None:
+                    self.artifacts.site.record(path, dest_path, meta)
+                rebuilt.append(dest_path)
+            elif self.is_static(path):
+                dest_path = self.static_destination(path)
+                if self.manifest.is_fresh(path, dest_path):
+                    continue
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                action = sync_file(path, dest_path, self.link_mode)
+                print(f"{'Linking' if action == 'linked' else 'Copying'} {path} to {dest_path}")
+                self.manifest.record(path, dest_path, "static")
+                rebuilt.append(dest_path)
+
+        if self.artifacts is not None and rebuilt:
+            rebuilt.extend(self.artifacts.write())
+            self.artifacts.site.save()
+        if search.active_index is not None:
+            search.active_index.save()
+        if compress.active_compressor is not None and (rebuilt or removed):
+            compress.active_compressor.sweep()
+            compress.active_compressor.save()
+        self.manifest.save()
+        if self.index is not None:
+            self.index.save()
+        return rebuilt
+
+
+def start_server(directory, port):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("localhost", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(watcher, port, interval=0.2):
+    server = start_server(watcher.target_directory, port)
+    print(f"Serving {watcher.target_directory} at http://localhost:{port}/ (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            watcher.poll()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+import compress
+from conversions import render_page
+from parallel import page_executor
+
+STOP = None
+
+
+class PageWriter:
+    # Writes finished pages from a bounded queue on a dedicated thread. A full
+    # queue blocks submit(), which holds renderers back instead of letting
+    # rendered pages pile up in memory.
+    def __init__(self, max_queue=64, batch_size=32, atomic=False):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.atomic = atomic
+        self.known_dirs = set()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.error = None
+        self.pages = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.batches = 0
+        self.max_depth = 0
+        self.depth_total = 0
+        self.submits = 0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, dest_path, html):
+        if self.error is not None:
+            raise self.error
+        depth = self.queue.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self.depth_total += depth
+        self.submits += 1
+        self.queue.put((dest_path, html))
+
+    def close(self):
+        self.queue.put(STOP)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not STOP:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is STOP
+            pages = batch[:-1] if stop else batch
+            if pages and self.error is None:
+                try:
+                    self.write_batch(pages)
+                except Exception as e:
+                    self.error = e
+            if stop:
+                return
+
+    def write_batch(self, pages):
+        started = time.perf_counter()
+        directories = {os.path.dirname(dest_path) for dest_path, _ in pages} - self.known_dirs
+        for directory in sorted(directories):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.known_dirs |= directories
+        for dest_path, html in pages:
+            path = f"{dest_path}.{os.getpid()}.tmp" if self.atomic else dest_path
+            with open(path, "w") as f:
+                f.write(html)
+            if self.atomic:
+                os.replace(path, dest_path)
+            if compress.active_compressor is not None:
+                compress.active_compressor.submit(dest_path, html.encode())
+            self.pages += 1
+            self.bytes += len(html)
+        self.batches += 1
+        self.busy += time.perf_counter() - started
+
+    def summary(self):
+        throughput = self.bytes / 1e6 / self.busy if self.busy else 0.0
+        mean_depth = self.depth_total / self.submits if self.submits else 0.0
+        return (
+            f"Writer: {self.pages} page(s) in {self.batches} batch(es), {self.bytes / 1e6:.2f} MB "
+            f"at {throughput:.1f} MB/s; queue depth mean {mean_depth:.1f}, max {self.max_depth}"
+        )
+
+
+def render_job(from_path, template_path, basepath):
+    print(f"Rendering {from_path}")
+    try:
+        return render_page(from_path, template_path, basepath), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def generate_pages_pipelined(pages, template_path, basepath, writer, jobs=1, manifest=None, site=None, mp_context=None):
+    fresh = set()
+    if manifest is not None:
+        fresh = {page for page in pages if manifest.is_fresh(*page)}
+    all_pages = pages
+    pages = [page for page in pages if page not in fresh]
+    errors = []
+    written = []
+    pages_meta = {}
+
+    def deliver(page, result):
+        rendered, error = result
+        if error is not None:
+            errors.append((page[0], error))
+            return
+        pages_meta[page[0]], html = rendered
+        writer.submit(page[1], html)
+        written.append(page)
+
+    if jobs <= 1:
+        for page in pages:
+            deliver(page, render_job(page[0], template_path, basepath))
+    else:
+        # At most a few pages per worker are in flight; results are taken in
+        # page order, so errors come out in the same order as a serial build.
+        window = deque()
+        with page_executor(jobs, mp_context) as executor:
+            for page in pages:
+                window.append((page, executor.submit(render_job, page[0], template_path, basepath)))
+                if len(window) >= jobs * 4:
+                    oldest, future = window.popleft()
+                    deliver(oldest, future.result())
+            while window:
+                oldest, future = window.popleft()
+                deliver(oldest, future.result())
+
+    writer.close()
+    # Fresh and written pages reach the site index in page order, as in a
+    # serial build.
+    done = set(written)
+    for page in all_pages:
+        from_path, dest_path = page
+        if page in fresh:
+            if site is not None:
+                site.keep(from_path, dest_path)
+        elif page in done:
+            if manifest is not None:
+                manifest.record(from_path, dest_path, "page")
+            if site is not None:
+                site.record(from_path, dest_path, pages_meta[from_path])
+    if errors:
+        details = "\n".join(f"  {from_path}: {message}" for from_path, message in errors)
+        raise ValueError(f"{len(errors)} page(s) failed to build:\n{details}")
+    return written